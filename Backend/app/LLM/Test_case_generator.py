@@ -11,7 +11,13 @@ from app.models.postgress_writer import (
 )
 import pandas as pd
 from .impact_analyzer import analyze_test_case_impacts
+from .summarizer import PENDING_SUMMARY
+from . import llm_calls
+from app.models.lance_utils import get_story_row, scope_filter
+from app.models.vector_index import vector_search
+import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 import re
@@ -25,7 +31,17 @@ TABLE_NAME = Config.TABLE_NAME_LANCE
 TOP_K = 3
 MAX_MAIN_TEXT_CHARS = 5000
 BATCH_SIZE = 10  # Increased batch size for more efficient generation
+# Category batches of one story sent to the LLM at the same time
+TEST_CASE_BATCH_CONCURRENCY = int(os.getenv("TEST_CASE_BATCH_CONCURRENCY", "4"))
+# Stories generated at the same time by generate_test_cases_for_all_stories (1 = one after another)
+STORY_GENERATION_CONCURRENCY = int(os.getenv("STORY_GENERATION_CONCURRENCY", "3"))
 MAX_RETRIES = 3
+# Returned by generate_and_store_test_cases for stories it leaves alone on purpose
+SKIPPED = "skipped"
+# batched: one prompt per category batch of ~BATCH_SIZE cases
+# structured: all categories in as few category-keyed JSON calls as STRUCTURED_MAX_CASES_PER_CALL allows
+TEST_CASE_GENERATION_MODE = os.getenv("TEST_CASE_GENERATION_MODE", "batched").lower()
+STRUCTURED_MAX_CASES_PER_CALL = int(os.getenv("STRUCTURED_MAX_CASES_PER_CALL", "40"))
 
 # Load prompt
 with open("Backend/app/LLM/test_case_prompt.txt", "r", encoding="utf-8") as f:
@@ -129,8 +145,9 @@ class JSONResponseHandler:
         except json.JSONDecodeError as e:
             print(f"JSON parsing error: {str(e)}")
             print("Attempting to fix malformed JSON...")
-            # Create a minimal valid response
+            # Create a minimal valid response (flagged so the caller can drop the cached reply)
             return {
+                "parse_error": True,
                 "test_cases": [{
                     "id": f"{story_id}-TC{current_count + 1}",
                     "title": "Error in test case generation",
@@ -201,7 +218,7 @@ class TestCaseGenerator:
         else:
             return "low"
 
-    def get_category_counts(self, complexity: str) -> Dict[str, int]:
+    def get_category_counts(self, complexity: str, seed: Optional[str] = None) -> Dict[str, int]:
         """Get test case counts based on story complexity"""
         base_counts = {
             "low": {
@@ -227,10 +244,11 @@ class TestCaseGenerator:
             }
         }
         
-        # Add some randomization (±20%)
+        # Add some randomization (±20%); seeded per story so a replayed run sends the same prompts
+        rng = random.Random(seed) if seed is not None else random
         counts = base_counts[complexity]
         return {
-            category: max(1, int(count * random.uniform(0.8, 1.2)))
+            category: max(1, int(count * rng.uniform(0.8, 1.2)))
             for category, count in counts.items()
         }
 
@@ -248,7 +266,7 @@ class TestCaseGenerator:
             
             # Get story complexity and determine test case counts
             complexity = self.get_story_complexity(story_description, story_description)
-            category_counts = self.get_category_counts(complexity)
+            category_counts = self.get_category_counts(complexity, seed=story_id)
             
             # Define test case categories with dynamic counts
             categories = [
@@ -279,26 +297,15 @@ class TestCaseGenerator:
                 }
             ]
             
-            # Generate test cases in batches for each category
+            # Generate all categories, then number the test cases in category order
+            if TEST_CASE_GENERATION_MODE == "structured":
+                results = self.generate_structured(story_id, story_description, categories)
+            else:
+                results = self.generate_category_batches(story_id, story_description, categories)
             for category in categories:
-                remaining = category["count"]
-                while remaining > 0:
-                    batch_count = min(BATCH_SIZE, remaining)
-                    batch = self.generate_test_cases_batch(
-                        story_id,
-                        story_description,
-                        category["type"],
-                        category["focus"],
-                        len(final_test_cases["test_cases"]),
-                        batch_count
-                    )
-                    
-                    if "test_cases" in batch:
-                        final_test_cases["test_cases"].extend(batch["test_cases"])
-                        remaining -= len(batch["test_cases"])
-                    else:
-                        print(f"Warning: No test cases generated for {category['type']} batch")
-                        break
+                final_test_cases["test_cases"].extend(results[category["type"]])
+            for i, test_case in enumerate(final_test_cases["test_cases"]):
+                test_case["id"] = f"{story_id}-TC{i + 1}"
             
             # Update total count
             final_test_cases["total_test_cases"] = len(final_test_cases["test_cases"])
@@ -309,12 +316,172 @@ class TestCaseGenerator:
             print(f"Error generating test cases: {e}")
             raise
 
+    def generate_category_batches(self, story_id: str, story_description: str, categories: List[Dict],
+                                  start_counts: Optional[Dict[str, int]] = None) -> Dict[str, List[Dict]]:
+        """
+        Run every category's batches on a pool of TEST_CASE_BATCH_CONCURRENCY LLM calls.
+        Categories that come back short are topped up in further rounds, like the old
+        sequential loop did. Returns test cases per category in batch order.
+        Each batch is told where it starts (start_counts, for cases the caller already
+        has, plus everything planned before it), so no two batches send the same prompt.
+        """
+        start_counts = start_counts or {}
+        results = {category["type"]: [] for category in categories}
+        remaining = {category["type"]: category["count"] for category in categories}
+
+        with ThreadPoolExecutor(max_workers=max(1, TEST_CASE_BATCH_CONCURRENCY)) as executor:
+            while True:
+                tasks = []
+                for category in categories:
+                    offset = start_counts.get(category["type"], 0) + len(results[category["type"]])
+                    planned = 0
+                    while planned < remaining[category["type"]]:
+                        batch_count = min(BATCH_SIZE, remaining[category["type"]] - planned)
+                        tasks.append((category, offset + planned, batch_count))
+                        planned += batch_count
+                if not tasks:
+                    return results
+
+                futures = [
+                    executor.submit(
+                        self.generate_test_cases_batch,
+                        story_id,
+                        story_description,
+                        category["type"],
+                        category["focus"],
+                        current_count,
+                        batch_count
+                    )
+                    for category, current_count, batch_count in tasks
+                ]
+
+                for (category, _, _), future in zip(tasks, futures):
+                    batch = future.result()
+                    if batch and "test_cases" in batch:
+                        results[category["type"]].extend(batch["test_cases"])
+                        remaining[category["type"]] -= len(batch["test_cases"])
+                    else:
+                        print(f"Warning: No test cases generated for {category['type']} batch")
+                        remaining[category["type"]] = 0
+
+    def generate_structured(self, story_id: str, story_description: str, categories: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Ask for every category in one category-keyed JSON response (two or more when the
+        story needs over STRUCTURED_MAX_CASES_PER_CALL cases), so the instructions and story
+        are sent once instead of once per batch. Categories that come back short are topped
+        up with generate_category_batches for the missing count only.
+        """
+        groups, group, group_size = [], [], 0
+        for category in categories:
+            if group and group_size + category["count"] > STRUCTURED_MAX_CASES_PER_CALL:
+                groups.append(group)
+                group, group_size = [], 0
+            group.append(category)
+            group_size += category["count"]
+        if group:
+            groups.append(group)
+
+        print(f"🧩 {story_id}: {len(categories)} categories in {len(groups)} structured call(s)")
+        results = {category["type"]: [] for category in categories}
+        with ThreadPoolExecutor(max_workers=max(1, min(len(groups), TEST_CASE_BATCH_CONCURRENCY))) as executor:
+            futures = [executor.submit(self.generate_structured_call, story_id, story_description, g) for g in groups]
+            for future in futures:
+                for test_type, test_cases in future.result().items():
+                    results[test_type].extend(test_cases)
+
+        shortfall = []
+        for category in categories:
+            missing = category["count"] - len(results[category["type"]])
+            if missing > 0:
+                print(f"Warning: {category['type']} came back {missing} short, topping up")
+                shortfall.append({**category, "count": missing})
+        if shortfall:
+            top_up = self.generate_category_batches(
+                story_id, story_description, shortfall,
+                start_counts={category["type"]: len(results[category["type"]]) for category in shortfall}
+            )
+            for test_type, test_cases in top_up.items():
+                results[test_type].extend(test_cases)
+        return results
+
+    def generate_structured_call(self, story_id: str, story_description: str, categories: List[Dict]) -> Dict[str, List[Dict]]:
+        """One LLM call for several categories; returns the valid test cases per category (at most each count)"""
+        category_lines = "\n".join(
+            f"- {category['type']}: exactly {category['count']} test cases, focusing on {', '.join(category['focus'])}"
+            for category in categories
+        )
+        schema = ",\n".join(f'    "{category["type"]}": [ ...{category["count"]} test case objects... ]' for category in categories)
+        prompt = f"""You are a Senior QA Architect with 15+ years of experience in enterprise software testing.
+Your task is to generate test cases for this user story in the following categories:
+{category_lines}
+
+Story ID: {story_id}
+Description: {story_description}
+
+Requirements:
+1. Every test case belongs to exactly one category and matches that category's focus
+2. Each test case must be unique and detailed
+3. Include specific validation points
+4. Consider error scenarios and edge cases
+
+CRITICAL: Your response MUST be a valid JSON object with one key per category:
+{{
+{schema}
+}}
+Each test case object has this exact structure:
+{{
+    "id": "{story_id}-TC1",
+    "title": "Detailed description of what is being tested",
+    "steps": [
+        "Step 1: Detailed step with specific actions",
+        "Step 2: Detailed step with validation points"
+    ],
+    "expected_result": "Comprehensive description of expected outcomes",
+    "priority": "High" | "Medium" | "Low"
+}}
+
+Remember:
+- Be extremely detailed and specific
+- Make steps clear and actionable
+- Include specific test data
+- Return ONLY the JSON object, no other text
+- Do not use markdown code blocks"""
+
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = llm_calls.invoke(prompt, Config.llm)
+                json_str = JSONResponseHandler.extract_json_from_text(response.content.strip())
+                data = json.loads(JSONResponseHandler.clean_malformed_json(json_str))
+                if not isinstance(data, dict):
+                    raise ValueError("Response is not a JSON object")
+
+                results = {}
+                for category in categories:
+                    test_cases = data.get(category["type"])
+                    if not isinstance(test_cases, list):
+                        test_cases = []
+                    results[category["type"]] = [
+                        JSONResponseHandler.validate_test_case_structure(tc)
+                        for tc in test_cases[:category["count"]]
+                        if isinstance(tc, dict)
+                    ]
+                print(f"✅ Structured call generated {sum(len(v) for v in results.values())} test cases "
+                      f"({', '.join(f'{k}: {len(v)}' for k, v in results.items())})")
+                return results
+            except Exception as e:
+                print(f"Structured attempt {attempt + 1}/{MAX_RETRIES} failed: {str(e)}")
+                llm_calls.discard(prompt, Config.llm)
+
+        # Nothing usable: the caller tops up every category through the batched path
+        return {category["type"]: [] for category in categories}
+
     def generate_test_cases_batch(self, story_id: str, story_description: str, test_type: str, focus_areas: List[str], current_count: int, batch_size: int) -> Dict:
         """Generate a batch of test cases for a given category"""
         for attempt in range(MAX_RETRIES):
             try:
-                # Randomize the actual batch size slightly
-                actual_batch_size = random.randint(max(1, batch_size - 2), batch_size + 2)
+                # Randomize the actual batch size slightly (deterministically, so replays hit the response cache)
+                rng = random.Random(f"{story_id}:{test_type}:{current_count}:{attempt}")
+                actual_batch_size = rng.randint(max(1, batch_size - 2), batch_size + 2)
                 
                 # Create a focused prompt for this specific batch
                 batch_prompt = f"""You are a Senior QA Architect with 15+ years of experience in enterprise software testing.
@@ -357,8 +524,8 @@ Remember:
 - Return ONLY the JSON object, no other text
 - Do not use markdown code blocks"""
 
-                # Call LLM
-                response = Config.llm.invoke(batch_prompt)
+                # Call LLM (shared request budget across all stories being generated)
+                response = llm_calls.invoke(batch_prompt, Config.llm)
                 response_text = response.content.strip()
                 
                 # Use the new JSON handler to parse and validate the response
@@ -368,12 +535,18 @@ Remember:
                     current_count
                 )
                 
+                if batch_test_cases and batch_test_cases.pop("parse_error", False):
+                    # Keep the placeholder for this run, but let the next run ask the model again
+                    llm_calls.discard(batch_prompt, Config.llm)
+                
                 if batch_test_cases and batch_test_cases.get("test_cases"):
                     print(f"✅ Successfully generated {len(batch_test_cases['test_cases'])} {test_type} test cases")
                     return batch_test_cases
+                llm_calls.discard(batch_prompt, Config.llm)
                     
             except Exception as e:
                 print(f"Attempt {attempt + 1}/{MAX_RETRIES} failed: {str(e)}")
+                llm_calls.discard(batch_prompt, Config.llm)
                 if attempt < MAX_RETRIES - 1:
                     print("Retrying...")
                     continue
@@ -409,6 +582,13 @@ def generate_test_case_for_story(story_id, llm_ref=None):
 
 async def _generate_test_case_for_story(story_id, llm_ref=None):
     """Async implementation of test case generation"""
+    return generate_and_store_test_cases(story_id, llm_ref)
+
+def generate_and_store_test_cases(story_id, llm_ref=None):
+    """
+    Generate test cases for one story, store them and run impact analysis (blocking).
+    Returns the test cases, SKIPPED for stories not ready to generate, or None on failure.
+    """
     if llm_ref is None:
         llm_ref = Config.llm
     
@@ -419,21 +599,23 @@ async def _generate_test_case_for_story(story_id, llm_ref=None):
         # Get story data from LanceDB
         db = lancedb.connect(Config.LANCE_DB_PATH)
         table = db.open_table(Config.TABLE_NAME_LANCE)
-        all_rows = table.to_pandas()
-        row_data = all_rows[all_rows['storyID'] == story_id]
+        row = get_story_row(table, story_id, ["storyID", "project_id", "storyDescription", "doc_content_text"])
         
-        if row_data.empty:
+        if row is None:
             print(f"❌ Story ID '{story_id}' not found in LanceDB.")
-            return
+            return SKIPPED
         
-        row = row_data.iloc[0].to_dict()
         project_id = row.get("project_id", "")
         story_description = row["storyDescription"]
-        main_text = row.get("doc_content_text", "").strip()
+        main_text = (row.get("doc_content_text") or "").strip()
+        
+        if story_description == PENDING_SUMMARY:
+            print(f"⏳ Skipping {story_id} — summary not generated yet.")
+            return SKIPPED
         
         if not main_text:
             print(f"❌ Skipping {story_id} — missing doc_content_text.")
-            return
+            return SKIPPED
         
         print(f"🔍 Generating test case for: {story_id} (Project: {project_id})")
         
@@ -495,9 +677,12 @@ async def _generate_test_cases_for_all_stories():
     
     print(f"📊 Stories missing vectors: {missing_vector_count}")
     
-    # Get all story IDs and filter out already generated ones
+    # Get all story IDs and filter out already generated ones (and those still waiting for a summary)
+    pending_summary_ids = set(all_rows[all_rows['storyDescription'] == PENDING_SUMMARY]['storyID'])
+    if pending_summary_ids:
+        print(f"⏳ Stories waiting for a summary: {len(pending_summary_ids)}")
     all_story_ids = all_rows['storyID'].tolist()
-    records = [story_id for story_id in all_story_ids if story_id not in generated_ids]
+    records = [story_id for story_id in all_story_ids if story_id not in generated_ids and story_id not in pending_summary_ids]
     
     print(f"🟡 Found {len(records)} entries to process.\n")
     
@@ -505,17 +690,42 @@ async def _generate_test_cases_for_all_stories():
         print("✅ All stories with vectors have been processed!")
         return
         
-    for story_id in records:
-        await _generate_test_case_for_story(story_id)
-
-def Chat_RAG(user_query, top_k=3):
+    await _generate_backlog(records)
+
+async def _generate_backlog(story_ids, concurrency=STORY_GENERATION_CONCURRENCY):
+    """
+    Generate stories on a bounded pool of worker threads. A failing story is reported and
+    skipped without stopping the others; all LLM calls share one rate budget (see llm_calls).
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    progress = {"done": 0, "succeeded": 0, "skipped": 0, "failed": 0}
+    started = time.monotonic()
+
+    async def worker(story_id):
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(generate_and_store_test_cases, story_id)
+            except Exception as e:
+                print(f"❌ Unexpected error generating {story_id}: {e}")
+                result = None
+        status = "skipped" if result == SKIPPED else "succeeded" if result else "failed"
+        progress["done"] += 1
+        progress[status] += 1
+        elapsed = time.monotonic() - started
+        print(f"📈 [{progress['done']}/{len(story_ids)}] {story_id} {status} "
+              f"({progress['failed']} failed, {progress['skipped']} skipped, {elapsed:.0f}s elapsed)")
+
+    await asyncio.gather(*(worker(story_id) for story_id in story_ids))
+    print(f"✅ Backlog finished: {progress['succeeded']} generated, {progress['skipped']} skipped, {progress['failed']} failed "
+          f"in {time.monotonic() - started:.0f}s")
+
+def Chat_RAG(user_query, top_k=3, nprobes=None, refine_factor=None, project_id=None, source=None):
     db = lancedb.connect(Config.LANCE_DB_PATH)
     table = db.open_table(Config.TABLE_NAME_LANCE)
-    query_vector = Config.EMBEDDING_MODEL.encode(user_query).tolist()
+    query_vector = Config.ONLINE_EMBEDDER.encode(user_query).tolist()
 
     results = (
-        table.search(query_vector)
-        .metric("cosine")
+        vector_search(table, query_vector, nprobes, refine_factor, where=scope_filter(project_id, source))
         .limit(top_k)
         .to_list()
     )
@@ -1,3 +1,4 @@
+import os
 import json
 import uuid
 from datetime import datetime, timedelta
@@ -6,9 +7,11 @@ import numpy as np
 from ..config import Config
 from ..models.db_service import DatabaseService
 from ..models.postgress_writer import get_test_case_json_by_story_id
+from ..models.lance_utils import get_story_row, scope_filter, in_filter
+from ..models.vector_index import vector_search
+from . import llm_calls
 import asyncio
 from tenacity import retry, stop_after_attempt, wait_exponential
-import time
 import logging
 from typing import Dict, List, Optional
 import psycopg2
@@ -40,30 +43,10 @@ with open("Backend/app/LLM/impact_analysis_prompt.txt", "r", encoding="utf-8") a
 MAX_RETRIES = 3
 MAX_CONCURRENT_ANALYSES = 3
 MIN_WAIT_BETWEEN_CALLS = 1  # seconds
-MAX_STORIES_TO_ANALYZE = 5
+# Nearest stories in the same project compared against a new story (0 = every story in the project)
+MAX_STORIES_TO_ANALYZE = int(os.getenv("IMPACT_MAX_STORIES", "0"))
 API_TIMEOUT = 30  # seconds
 
-class RateLimiter:
-    def __init__(self, calls_per_minute: int = 50):
-        self.calls_per_minute = calls_per_minute
-        self.calls = []
-        
-    def can_make_call(self) -> bool:
-        now = time.time()
-        # Remove calls older than 1 minute
-        self.calls = [call_time for call_time in self.calls if now - call_time < 60]
-        return len(self.calls) < self.calls_per_minute
-        
-    def record_call(self):
-        self.calls.append(time.time())
-        
-    def wait_if_needed(self):
-        while not self.can_make_call():
-            time.sleep(1)
-        self.record_call()
-
-# Global rate limiter instance
-rate_limiter = RateLimiter()
 
 class ImpactAnalysisError(Exception):
     """Base class for Impact Analysis errors"""
@@ -90,11 +73,14 @@ def get_db_service() -> DatabaseService:
     Get the singleton instance of DatabaseService with proper error handling
     """
     try:
+        # Double-checked: backlog generation calls this from several threads at once
         if DatabaseService._instance is None:
-            DatabaseService(
-            postgres_config=Config.postgres_config(),
-            lance_db_path=Config.LANCE_DB_PATH
-        )
+            with DatabaseService._instance_lock:
+                if DatabaseService._instance is None:
+                    DatabaseService(
+                        postgres_config=Config.postgres_config(),
+                        lance_db_path=Config.LANCE_DB_PATH
+                    )
         return DatabaseService._instance
     except Exception as e:
         logger.error(f"Failed to get database service: {str(e)}")
@@ -110,7 +96,6 @@ def get_llm_analysis(prompt: str, llm_ref) -> Dict:
     Get analysis from LLM with retry logic and error handling
     """
     try:
-        rate_limiter.wait_if_needed()
         logger.debug("Making LLM API call")
         
         # Add explicit JSON formatting instructions
@@ -142,7 +127,8 @@ Just return the raw JSON object.
 """
         
         # Get response from LLM
-        response = llm_ref.invoke(structured_prompt)
+        # Rate limited together with every other LLM call in the process
+        response = llm_calls.invoke(structured_prompt, llm_ref)
         content = response.content.strip()
         
         # Clean up the response
@@ -199,9 +185,12 @@ Just return the raw JSON object.
         except json.JSONDecodeError as e:
             logger.error(f"Invalid JSON structure: {str(e)}")
             logger.error(f"Raw content: {content[:500]}")  # Log first 500 chars of content
+            # Don't let the retry be answered from the cache with the same bad response
+            llm_calls.discard(structured_prompt, llm_ref)
             raise LLMError("Invalid JSON response from LLM")
         except ValueError as e:
             logger.error(f"Invalid response format: {str(e)}")
+            llm_calls.discard(structured_prompt, llm_ref)
             logger.error(f"Parsed content: {json.dumps(result, indent=2)}")
             raise LLMError(f"Invalid response format: {str(e)}")
             
@@ -370,6 +359,32 @@ def store_impact_analysis(
         if conn:
             conn.close()
 
+def find_similar_project_stories(story_id: str, project_id: str, candidate_ids: set, limit: int) -> List[Dict]:
+    """
+    Nearest neighbours of a story within its project, restricted to candidate_ids.
+    Both restrictions are applied before the vector search, so all `limit` hits are
+    candidates (fewer only when the project has fewer).
+    """
+    candidate_ids = set(candidate_ids) - {story_id}
+    if not candidate_ids:
+        return []
+    db = lancedb.connect(Config.LANCE_DB_PATH)
+    table = db.open_table(Config.TABLE_NAME_LANCE)
+    story = get_story_row(table, story_id, ["vector"])
+    if story is None:
+        raise StoryNotFoundError(f"New story {story_id} not found")
+
+    where = " AND ".join(f for f in (scope_filter(project_id), in_filter("storyID", sorted(candidate_ids))) if f)
+    hits = vector_search(table, story["vector"], where=where).limit(limit).to_list()
+    return [
+        {
+            "id": hit["storyID"],
+            "description": hit.get("storyDescription"),
+            "similarity": 1 - hit["_distance"]
+        }
+        for hit in hits
+    ]
+
 def analyze_test_case_impacts(new_story_id: str, project_id: str, existing_story_id: str = None, similarity_score: float = None, llm_ref=None):
     """
     Analyze how a new story impacts existing test cases
@@ -420,6 +435,11 @@ def analyze_test_case_impacts(new_story_id: str, project_id: str, existing_story
             if not existing_story:
                 raise StoryNotFoundError(f"Existing story {existing_story_id} not found")
             stories_to_analyze = [existing_story]
+        elif MAX_STORIES_TO_ANALYZE > 0:
+            # Only the most similar stories with test cases, found by a project-prefiltered search
+            stories_to_analyze = find_similar_project_stories(
+                new_story_id, project_id, set(generated_stories), MAX_STORIES_TO_ANALYZE
+            )
         else:
             # Get all stories with test cases from the same project (excluding the new story)
             stories_to_analyze = [
@@ -467,7 +487,7 @@ def analyze_test_case_impacts(new_story_id: str, project_id: str, existing_story
                         project_id=project_id,
                         new_story_id=new_story_id,
                         existing_story_id=existing_story["id"],
-                        similarity_score=similarity_score if similarity_score is not None else 0.0
+                        similarity_score=similarity_score if similarity_score is not None else existing_story.get("similarity", 0.0)
                     )
                     
                     logger.info(f"Stored {impacts_stored} impacts for {existing_story['id']}")
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage
+
+from app.config import llm
+from app.LLM.rate_limiter import llm_rate_limiter, estimate_tokens
+from app.LLM.response_cache import get_response_cache, llm_identity, cache_key
+
+# Every Gemini call goes through these helpers so it draws from the shared llm_rate_limiter budget
+# and is answered from the response cache when the same model saw the same prompt before
+
+
+def _actual_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return None
+
+
+def _lookup(prompt: str, llm_ref, use_cache: bool):
+    """(cache, key, cached response) — cache and key are None when caching is off for this call"""
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return None, None, None
+    model, temperature = llm_identity(llm_ref)
+    key = cache_key(prompt, model, temperature)
+    content = cache.get(key)
+    return cache, key, (AIMessage(content=content) if content is not None else None)
+
+
+def _store(cache, key, llm_ref, response):
+    content = getattr(response, "content", None)
+    if cache is not None and isinstance(content, str) and content.strip():
+        tokens = _actual_tokens(response)
+        cache.put(key, llm_identity(llm_ref)[0], content, {"total_tokens": tokens} if tokens else None)
+
+
+def invoke(prompt: str, llm_ref=None, use_cache: bool = True):
+    """llm_ref.invoke(prompt) after reserving one request and the prompt's estimated tokens"""
+    if llm_ref is None:
+        llm_ref = llm
+    cache, key, cached = _lookup(prompt, llm_ref, use_cache)
+    if cached is not None:
+        return cached
+    estimated = estimate_tokens(prompt)
+    llm_rate_limiter.acquire(tokens=estimated)
+    response = llm_ref.invoke(prompt)
+    llm_rate_limiter.record_usage(estimated, _actual_tokens(response))
+    _store(cache, key, llm_ref, response)
+    return response
+
+
+async def ainvoke(prompt: str, llm_ref=None, use_cache: bool = True):
+    """Async invoke; waits for budget without blocking the event loop"""
+    if llm_ref is None:
+        llm_ref = llm
+    cache, key, cached = _lookup(prompt, llm_ref, use_cache)
+    if cached is not None:
+        return cached
+    estimated = estimate_tokens(prompt)
+    await llm_rate_limiter.acquire_async(tokens=estimated)
+    response = await llm_ref.ainvoke(prompt)
+    llm_rate_limiter.record_usage(estimated, _actual_tokens(response))
+    _store(cache, key, llm_ref, response)
+    return response
+
+
+def batch(prompts: List[str], llm_ref=None, max_concurrency: Optional[int] = None, return_exceptions: bool = True,
+          use_cache: bool = True) -> List:
+    """
+    Like llm_ref.batch(prompts, config={"max_concurrency": ...}, return_exceptions=...),
+    but each prompt takes its own share of the budget right before it is sent.
+    """
+    if not prompts:
+        return []
+    with ThreadPoolExecutor(max_workers=max_concurrency or len(prompts)) as executor:
+        futures = [executor.submit(invoke, prompt, llm_ref, use_cache) for prompt in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+
+def discard(prompt: str, llm_ref=None):
+    """Forget the cached response to `prompt`, e.g. after it failed to parse, so a retry asks again"""
+    cache = get_response_cache()
+    if cache is not None:
+        model, temperature = llm_identity(llm_ref if llm_ref is not None else llm)
+        cache.discard(cache_key(prompt, model, temperature))
@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+# One budget for every Gemini call in the process (generation, impact analysis, summaries, chat)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "50"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+# Reserved per call for the response until the real usage is known
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "1000"))
+METRICS_WINDOW = 1000
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough prompt size (~4 characters per token) plus the expected response"""
+    return len(prompt) // 4 + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    """Bucket of `capacity` units refilled continuously over one minute; not locked by itself"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (requests larger than the bucket wait for a full one)"""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.refill_per_second)
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter with a requests-per-minute and a tokens-per-minute
+    budget. Callers reserve an estimate up front and correct it with record_usage once
+    the response reports its real token count.
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE, tokens_per_minute: int = LLM_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.total_acquired = 0
+        self.total_wait_s = 0.0
+        self._wait_times_ms = deque(maxlen=METRICS_WINDOW)
+
+    def _try_take(self, count: int, tokens: int) -> float:
+        """Take the budget if available and return 0, otherwise return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_time(count), self.tokens.wait_time(tokens))
+            if wait == 0:
+                self.requests.level -= count
+                self.tokens.level -= tokens
+            return wait
+
+    def _record_wait(self, started: float, count: int):
+        waited = time.monotonic() - started
+        with self._lock:
+            self.total_acquired += count
+            self.total_wait_s += waited
+            self._wait_times_ms.append(waited * 1000)
+
+    def acquire(self, count: int = 1, tokens: int = 0):
+        """Block until `count` requests and `tokens` tokens fit in the budget"""
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._try_take(count, tokens)
+                if wait == 0:
+                    break
+                time.sleep(max(wait, 0.01))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        self._record_wait(started, count)
+
+    async def acquire_async(self, count: int = 1, tokens: int = 0):
+        """acquire() for coroutines: waits with asyncio.sleep instead of blocking the loop"""
+        started = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._try_take(count, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(max(wait, 0.01))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        self._record_wait(started, count)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Give back (or charge) the difference between the reserved estimate and real usage"""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            # May go negative: later callers then wait until the overdraft is refilled
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + estimated_tokens - actual_tokens)
+
+    @staticmethod
+    def _percentile(values, percentile):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        index = min(len(values) - 1, int(round(percentile / 100 * (len(values) - 1))))
+        return round(values[index], 3)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget levels and queue-wait metrics over the most recent acquisitions"""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait_times = list(self._wait_times_ms)
+            return {
+                "requests_per_minute": int(self.requests.capacity),
+                "tokens_per_minute": int(self.tokens.capacity),
+                "requests_available": round(self.requests.level, 2),
+                "tokens_available": int(self.tokens.level),
+                "waiting": self._waiting,
+                "total_acquired": self.total_acquired,
+                "total_wait_s": round(self.total_wait_s, 3),
+                "queue_wait_ms": {
+                    "p50": self._percentile(wait_times, 50),
+                    "p95": self._percentile(wait_times, 95),
+                    "max": round(max(wait_times), 3) if wait_times else 0.0
+                }
+            }
+
+
+# Global rate limiter instance
+llm_rate_limiter = RateLimiter()
@@ -0,0 +1,141 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Tuple
+
+from app.config import LazyResource, LLM_MODEL_NAME, LLM_TEMPERATURE
+
+# Identical prompts (retries, replayed scheduler runs, repeated impact analyses) reuse the stored response
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./data/llm_cache.sqlite")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))  # 0 = never expire
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+# Expiry and size eviction run on open and after this many writes
+EVICT_EVERY_PUTS = 100
+
+
+def llm_identity(llm_ref) -> Tuple[str, float]:
+    """(model, temperature) of an LLM client without building a lazy one"""
+    if isinstance(llm_ref, LazyResource):
+        # Config.llm and Config.llm_impact are both built from these settings
+        return LLM_MODEL_NAME, LLM_TEMPERATURE
+    return str(getattr(llm_ref, "model", LLM_MODEL_NAME)), float(getattr(llm_ref, "temperature", LLM_TEMPERATURE) or 0.0)
+
+def cache_key(prompt: str, model: str, temperature: float) -> str:
+    return hashlib.sha256(f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite store of LLM response texts with a TTL and least-recently-used size eviction"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_days: float = LLM_CACHE_TTL_DAYS, max_mb: float = LLM_CACHE_MAX_MB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        with self._lock, self._conn:
+            # WAL lets the web app and the scheduler use the same file
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT, usage TEXT, size INTEGER, "
+                "created_at REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.evict()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and created_at < now - self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, usage, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or self._expired(row[2], now):
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            usage = json.loads(row[1]) if row[1] else {}
+            self.tokens_saved += usage.get("total_tokens", 0) or 0
+            return row[0]
+
+    def put(self, key: str, model: str, content: str, usage: Optional[dict] = None):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, json.dumps(usage) if usage else None, size, now, now)
+            )
+            self._puts += 1
+            due = self._puts % EVICT_EVERY_PUTS == 0
+        if due:
+            self.evict()
+
+    def discard(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def evict(self) -> int:
+        """Drop expired responses, then the least recently used ones until under max_bytes"""
+        removed = 0
+        with self._lock, self._conn:
+            if self.ttl_seconds > 0:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                stale = []
+                for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+                removed += len(stale)
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tokens_saved": self.tokens_saved,
+                "entries": entries,
+                "size_mb": round(size / (1024 * 1024), 2)
+            }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache, or None when disabled or the file cannot be opened"""
+    global _cache, LLM_CACHE_ENABLED
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMResponseCache()
+            except Exception as e:
+                print(f"⚠️ LLM response cache disabled, could not open {LLM_CACHE_PATH}: {e}")
+                LLM_CACHE_ENABLED = False
+                return None
+        return _cache
@@ -0,0 +1,154 @@
+import os
+import re
+import numpy as np
+from app.config import llm, EMBEDDING_MODEL
+from app.models.content_cache import get_cached_summary, put_cached_summary, EMBEDDING_CACHE_MODEL
+from app.LLM import llm_calls
+
+SUMMARY_CHUNK_SIZE = 4000
+SUMMARY_MAX_CHUNKS = 3  # Limit to 3 chunks for efficiency
+# Chunk prompts sent to the LLM at the same time for one document
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "3"))
+JIRA_SUMMARY_MAX_CHARS = 150
+
+# "llm" asks Gemini; "extractive" picks the most central sentence locally with the embedding model
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "llm").lower()
+EXTRACTIVE_MAX_SENTENCES = 64
+EXTRACTIVE_MIN_SENTENCE_CHARS = 20
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n{2,}|\n(?=\s*[-*\u2022\d])")
+
+# Two-phase ingestion stores vector and text right away with this description;
+# fill_pending_summaries (app/datapipeline/summary_backfill.py) replaces it later
+TWO_PHASE_INGESTION = os.getenv("TWO_PHASE_INGESTION", "false").lower() == "true"
+PENDING_SUMMARY = "[Summary pending]"
+
+def split_for_summary(text, chunk_size=SUMMARY_CHUNK_SIZE, max_chunks=SUMMARY_MAX_CHUNKS):
+    """First max_chunks chunks of text; anything after them is never sliced"""
+    return [text[i:i + chunk_size] for i in range(0, min(len(text), chunk_size * max_chunks), chunk_size)]
+
+def summarize_extractive(text, max_chars=None, model=None):
+    """
+    One-sentence summary without an LLM: the sentence whose embedding is closest to the
+    mean embedding of all sentences in the text.
+    """
+    sentences = [" ".join(sentence.split()) for sentence in SENTENCE_SPLIT.split(text)]
+    sentences = [sentence for sentence in sentences if len(sentence) >= EXTRACTIVE_MIN_SENTENCE_CHARS]
+    sentences = sentences[:EXTRACTIVE_MAX_SENTENCES]
+
+    if not sentences:
+        summary = " ".join(text.split())
+    elif len(sentences) == 1:
+        summary = sentences[0]
+    else:
+        # Throwaway sentence vectors: encoded directly, not stored in the content cache
+        if model is None:
+            model = EMBEDDING_MODEL
+        vectors = np.asarray(model.encode(sentences), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        centroid = vectors.mean(axis=0)
+        summary = sentences[int(np.argmax(vectors @ centroid))]
+
+    if max_chars is not None and len(summary) > max_chars:
+        summary = summary[:max_chars - 3] + "..."
+    return summary
+
+def summarize_in_chunks(text, chunk_size=SUMMARY_CHUNK_SIZE, max_chunks=SUMMARY_MAX_CHUNKS, max_concurrency=SUMMARY_CONCURRENCY, llm_ref=None):
+    """
+    Summarize each chunk in one sentence, sending the chunk prompts to the LLM concurrently.
+    Summaries are cached by content hash and backend; failed summaries are never cached.
+    """
+    if llm_ref is None:
+        llm_ref = llm
+
+    if SUMMARIZER_BACKEND == "extractive":
+        # Extractive summaries depend on the embedding model, not the LLM
+        cache_kind = f"extractive-{chunk_size}x{max_chunks}:{EMBEDDING_CACHE_MODEL}"
+        cached = get_cached_summary(text, cache_kind)
+        if cached is not None:
+            return cached
+        try:
+            summary = summarize_extractive("".join(split_for_summary(text, chunk_size, max_chunks)))
+        except Exception as e:
+            print(f"❌ Extractive summary failed: {e}")
+            return "Summary could not be generated."
+        put_cached_summary(text, cache_kind, summary)
+        return summary
+
+    cache_kind = f"chunks-{chunk_size}x{max_chunks}"
+    cached = get_cached_summary(text, cache_kind)
+    if cached is not None:
+        return cached
+
+    try:
+        prompts = [
+            "Summarize the following document section in 1 sentence:\n\n" + chunk
+            for chunk in split_for_summary(text, chunk_size, max_chunks)
+        ]
+        if not prompts:
+            return ""
+
+        responses = llm_calls.batch(
+            prompts,
+            llm_ref,
+            max_concurrency=max_concurrency,
+            return_exceptions=True
+        )
+
+        summaries = []
+        failed = False
+        for response in responses:
+            if isinstance(response, Exception):
+                summaries.append("[Summary failed for a chunk]")
+                print(f"❌ LLM failed on a chunk: {response}")
+                failed = True
+            else:
+                summaries.append(response.content.strip())
+        summary = " ".join(summaries)
+        if not failed:
+            put_cached_summary(text, cache_kind, summary)
+        return summary
+    except Exception as e:
+        print(f"❌ LLM summary failed: {e}")
+        return "Summary could not be generated."
+
+def summarize_jira_story(content, llm_ref=None):
+    """One-sentence summary of a Jira story, hard-limited to JIRA_SUMMARY_MAX_CHARS"""
+    if llm_ref is None:
+        llm_ref = llm
+
+    if SUMMARIZER_BACKEND == "extractive":
+        cache_kind = f"jira-extractive:{EMBEDDING_CACHE_MODEL}"
+        cached = get_cached_summary(content, cache_kind)
+        if cached is not None:
+            return cached
+        try:
+            summary = summarize_extractive(content[:2000], max_chars=JIRA_SUMMARY_MAX_CHARS)
+        except Exception as e:
+            print(f"❌ Extractive summary failed: {e}")
+            return content.strip().split('\n')[0][:147] + "..."
+        put_cached_summary(content, cache_kind, summary)
+        return summary
+
+    cached = get_cached_summary(content, "jira")
+    if cached is not None:
+        return cached
+    try:
+        prompt = (
+            "Generate a VERY CONCISE one-sentence summary (maximum 150 characters) of this Jira story. "
+            "Focus only on the main requirement or functionality. "
+            "Do not include technical details or implementation specifics.\n\n"
+            f"{content[:2000]}"
+        )
+        response = llm_calls.invoke(prompt, llm_ref)
+        summary = response.content.strip()
+
+        # Enforce hard limit of 150 characters
+        if len(summary) > JIRA_SUMMARY_MAX_CHARS:
+            summary = summary[:JIRA_SUMMARY_MAX_CHARS - 3] + "..."
+
+        put_cached_summary(content, "jira", summary)
+        return summary
+    except Exception as e:
+        print(f"❌ Summary generation failed: {e}")
+        # Create a truncated summary from the content itself
+        return content.strip().split('\n')[0][:147] + "..."
@@ -3,12 +3,12 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 from app.models.db_service import DatabaseService, get_db_service
-from app.config import Config
+from app.config import Config, warm_up_resources
 
 # Load environment variables
 load_dotenv()
 
-def create_app():
+def create_app(warm_up=None):
     app = Flask(__name__)
     
     # Configure CORS with proper settings
@@ -35,4 +35,10 @@ def create_app():
     from app.routes.stories import stories_bp
     app.register_blueprint(stories_bp, url_prefix='/api/stories')
 
+    # Optionally load the embedding model and LLM clients before the first request
+    if warm_up is None:
+        warm_up = Config.WARM_UP_MODELS
+    if warm_up:
+        warm_up_resources(background=True)
+
     return app 
\ No newline at end of file
@@ -1,18 +1,143 @@
 import os
+import threading
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from langchain_google_genai import ChatGoogleGenerativeAI
 import psycopg2
 
 load_dotenv()
 
-EMBEDDING_MODEL = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'sentence-transformers/all-mpnet-base-v2')
+# CPU inference backend: torch (fp32), torch-int8 or onnx-int8; all keep the 768-dim output
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+LLM_MODEL_NAME = os.getenv('LLM_MODEL_NAME', 'models/gemini-2.0-flash')
+LLM_TEMPERATURE = 0.3
+# When set (e.g. http://127.0.0.1:5002), encode calls go to the shared embedding service
+EMBEDDING_SERVICE_URL = os.getenv('EMBEDDING_SERVICE_URL', '')
+
+
+class LazyResource:
+    """Proxy that builds a heavy object on first use and shares it across the process"""
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the wrapped object, building it on the first call"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    print(f"⏳ Loading {self._name}...")
+                    self._instance = self._factory()
+                    print(f"✅ {self._name} ready")
+        return self._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy itself does not define
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyResource {self._name} ({state})>"
+
+
+class ResourceRegistry:
+    """Registry of lazily built, process-wide resources (embedding model, LLM clients)"""
+
+    def __init__(self):
+        self._resources = {}
+
+    def register(self, name, factory) -> LazyResource:
+        resource = LazyResource(name, factory)
+        self._resources[name] = resource
+        return resource
+
+    def get(self, name):
+        return self._resources[name].get()
+
+    def loaded(self):
+        return [name for name, resource in self._resources.items() if resource.loaded]
+
+    def warm_up(self, names=None, background=False):
+        """Build the given resources (all by default) ahead of the first request"""
+        names = list(names) if names else list(self._resources)
+
+        def _load():
+            for name in names:
+                try:
+                    self._resources[name].get()
+                except Exception as e:
+                    print(f"❌ Warm-up failed for {name}: {e}")
+
+        if background:
+            thread = threading.Thread(target=_load, name="resource-warm-up", daemon=True)
+            thread.start()
+            return thread
+        _load()
+        return None
+
+
+def build_local_embedding_model():
+    """Load the embedding model into this process using the configured backend"""
+    from app.datapipeline.embedding_backends import load_embedding_model
+    return load_embedding_model(EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND)
+
+
+def _build_embedding_model():
+    if EMBEDDING_SERVICE_URL:
+        from app.services.embedding_service import EmbeddingServiceClient
+        return EmbeddingServiceClient(EMBEDDING_SERVICE_URL)
+    return build_local_embedding_model()
+
+
+def _build_online_embedder():
+    # Request handlers encode one string at a time; coalesce concurrent calls into batches
+    if os.getenv('EMBEDDING_MICRO_BATCHING', 'true').lower() != 'true':
+        return EMBEDDING_MODEL.get()
+    from app.services.embedding_batcher import MicroBatchEncoder
+    return MicroBatchEncoder(
+        EMBEDDING_MODEL.get(),
+        max_batch_size=int(os.getenv('EMBEDDING_BATCH_MAX_SIZE', '32')),
+        max_wait_ms=float(os.getenv('EMBEDDING_BATCH_MAX_WAIT_MS', '5'))
+    )
+
+
+def _build_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL_NAME,
+        temperature=LLM_TEMPERATURE,
+        google_api_key=os.environ["GOOGLE_API_KEY"]
+    )
+
+
+def _build_llm_impact():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=LLM_MODEL_NAME,
+        temperature=LLM_TEMPERATURE,
+        google_api_key=os.environ.get("GOOGLE_API_KEY_IMPACT", os.environ["GOOGLE_API_KEY"])
+    )
+
+
+resources = ResourceRegistry()
+
+# Nothing is loaded until first use, so short-lived scripts never pay for the model
+EMBEDDING_MODEL = resources.register("EMBEDDING_MODEL", _build_embedding_model)
+ONLINE_EMBEDDER = resources.register("ONLINE_EMBEDDER", _build_online_embedder)
+llm = resources.register("llm", _build_llm)
+llm_impact = resources.register("llm_impact", _build_llm_impact)
+
+
+def warm_up_resources(names=None, background=False):
+    """Optional warm-up hook, e.g. for the web app before it starts serving"""
+    return resources.warm_up(names, background=background)
 
-llm = ChatGoogleGenerativeAI(
-    model="models/gemini-2.0-flash",
-    temperature=0.3,
-    google_api_key=os.environ["GOOGLE_API_KEY"]
-)
 
 class Config:
     # Database configurations
@@ -21,20 +146,26 @@ class Config:
     POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD', 'admin')
     POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'localhost')
     POSTGRES_PORT = os.getenv('POSTGRES_PORT', '5432')
-    
+
     LANCE_DB_PATH = os.getenv('LANCE_DB_PATH', './data/lance_db')
     TABLE_NAME_LANCE = os.getenv('TABLE_NAME_LANCE', 'user_stories')
+    # Companion table holding one vector per chunk of each story
+    TABLE_NAME_LANCE_CHUNKS = os.getenv('TABLE_NAME_LANCE_CHUNKS', 'user_story_chunks')
+    EMBEDDING_MODEL_NAME = EMBEDDING_MODEL_NAME
+    EMBEDDING_BACKEND = EMBEDDING_BACKEND
+    EMBEDDING_SERVICE_URL = EMBEDDING_SERVICE_URL
     EMBEDDING_MODEL = EMBEDDING_MODEL
+    # Micro-batched encoder for single-string calls made inside request threads
+    ONLINE_EMBEDDER = ONLINE_EMBEDDER
 
     # Original LLM instance
     llm = llm
 
     # Additional LLM for impact analysis
-    llm_impact = ChatGoogleGenerativeAI(
-        model="models/gemini-2.0-flash",
-        temperature=0.3,
-        google_api_key=os.environ.get("GOOGLE_API_KEY_IMPACT", os.environ["GOOGLE_API_KEY"])
-    )
+    llm_impact = llm_impact
+
+    # Load the embedding model and LLM clients when the web app starts instead of on first request
+    WARM_UP_MODELS = os.getenv('WARM_UP_MODELS', 'false').lower() == 'true'
 
     # Test case generation configuration
     TEST_CASE_COUNTS = {
@@ -44,7 +175,7 @@ class Config:
         "security": int(os.getenv('TEST_CASE_COUNT_SECURITY', '10')),   # Security tests
         "performance": int(os.getenv('TEST_CASE_COUNT_PERFORMANCE', '10'))  # Performance tests
     }
-    
+
     @classmethod
     def get_postgres_connection(cls):
         return psycopg2.connect(
@@ -54,7 +185,7 @@ class Config:
             host=cls.POSTGRES_HOST,
             port=cls.POSTGRES_PORT
         )
-    
+
     @classmethod
     def postgres_config(cls):
         return {
@@ -81,4 +212,4 @@ config = {
     'production': ProductionConfig,
     'testing': TestingConfig,
     'default': DevelopmentConfig
-} 
\ No newline at end of file
+}
@@ -0,0 +1,127 @@
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import lancedb
+from app.config import Config, EMBEDDING_MODEL
+from app.models.create_dbs import create_chunk_table
+from app.models.lance_writer import get_writer
+from app.models.content_cache import encode_cached
+from app.models.vector_index import vector_search
+from app.models.lance_utils import scope_filter
+
+# mpnet truncates input at 384 tokens; ~1200 characters stays under that for English text
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+MAX_CHUNKS_PER_STORY = int(os.getenv("MAX_CHUNKS_PER_STORY", "64"))
+# Characters passed to the encoder for the whole-story vector; the rest would be truncated anyway
+STORY_EMBED_MAX_CHARS = int(os.getenv("STORY_EMBED_MAX_CHARS", "4000"))
+# Chunk hits fetched per requested story before aggregating with max-sim
+CHUNK_SEARCH_OVERFETCH = int(os.getenv("CHUNK_SEARCH_OVERFETCH", "5"))
+
+def truncate_for_embedding(text: str) -> str:
+    """Skip tokenizing text the model would drop at its max sequence length"""
+    return text[:STORY_EMBED_MAX_CHARS]
+
+def split_into_chunks(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into overlapping chunks, preferring to break at whitespace"""
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text) and len(chunks) < MAX_CHUNKS_PER_STORY:
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Back up to the last whitespace in the second half of the window
+            split_at = text.rfind(" ", start + chunk_size // 2, end)
+            if split_at != -1:
+                end = split_at
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        # Start the next chunk `overlap` characters back, at a word boundary
+        next_start = end - overlap
+        boundary = text.find(" ", next_start, end)
+        if boundary != -1:
+            next_start = boundary + 1
+        start = max(next_start, start + 1)
+    return chunks
+
+def open_chunk_table(db=None):
+    if db is None:
+        db = lancedb.connect(Config.LANCE_DB_PATH)
+    try:
+        return db.open_table(Config.TABLE_NAME_LANCE_CHUNKS)
+    except Exception:
+        return create_chunk_table()
+
+_chunk_writer = None
+
+def get_chunk_writer():
+    """Shared buffered writer for the chunk table, creating the table on first use"""
+    global _chunk_writer
+    if _chunk_writer is None:
+        _chunk_writer = get_writer(Config.TABLE_NAME_LANCE_CHUNKS, open_chunk_table())
+    return _chunk_writer
+
+def index_story_chunks(stories: List[Dict], chunk_table=None, model=None) -> int:
+    """
+    Embed every chunk of the given stories with one encode call. Rows go to the shared
+    buffered chunk writer, or straight to `chunk_table` with one add when one is given.
+    Each story dict needs storyID, project_id and text. Returns the number of chunks written.
+    """
+    if model is None:
+        model = EMBEDDING_MODEL
+
+    chunk_rows = []
+    for story in stories:
+        for chunk_index, chunk in enumerate(split_into_chunks(story["text"])):
+            chunk_rows.append({
+                "storyID": story["storyID"],
+                "project_id": story.get("project_id", ""),
+                "chunk_index": chunk_index,
+                "chunk_text": chunk
+            })
+
+    if not chunk_rows:
+        return 0
+
+    vectors = encode_cached([row["chunk_text"] for row in chunk_rows], model)
+    timestamp = datetime.now()
+    for row, vector in zip(chunk_rows, vectors):
+        row["vector"] = vector.tolist()
+        row["embedding_timestamp"] = timestamp
+
+    if chunk_table is None:
+        get_chunk_writer().add(chunk_rows)
+    else:
+        chunk_table.add(chunk_rows)
+    return len(chunk_rows)
+
+def search_chunks(query_vector, limit: int, chunk_table=None, nprobes: Optional[int] = None, refine_factor: Optional[int] = None,
+                  project_id: Optional[str] = None) -> List[Dict]:
+    """
+    Search chunk vectors and aggregate hits per story with max-sim (smallest cosine distance).
+    Returns [{'storyID', '_distance', 'chunk_index', 'chunk_text'}] for the best `limit` stories.
+    """
+    if chunk_table is None:
+        chunk_table = open_chunk_table()
+    hits = (
+        vector_search(chunk_table, query_vector, nprobes, refine_factor, where=scope_filter(project_id))
+        .limit(limit * CHUNK_SEARCH_OVERFETCH)
+        .to_list()
+    )
+
+    best: Dict[str, Dict] = {}
+    for hit in hits:
+        current: Optional[Dict] = best.get(hit["storyID"])
+        if current is None or hit["_distance"] < current["_distance"]:
+            best[hit["storyID"]] = {
+                "storyID": hit["storyID"],
+                "_distance": hit["_distance"],
+                "chunk_index": hit["chunk_index"],
+                "chunk_text": hit["chunk_text"]
+            }
+
+    return sorted(best.values(), key=lambda hit: hit["_distance"])[:limit]
@@ -0,0 +1,115 @@
+import os
+from typing import List
+
+import numpy as np
+
+# Supported values for EMBEDDING_BACKEND
+BACKEND_TORCH = "torch"            # fp32 PyTorch (reference)
+BACKEND_TORCH_INT8 = "torch-int8"  # dynamically quantized Linear layers, PyTorch
+BACKEND_ONNX_INT8 = "onnx-int8"    # int8-quantized ONNX Runtime graph
+BACKENDS = (BACKEND_TORCH, BACKEND_TORCH_INT8, BACKEND_ONNX_INT8)
+
+ONNX_CACHE_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./data/onnx_models")
+# avx2 works on every x86-64 server we run on; avx512_vnni is faster where available
+ONNX_QUANTIZATION_TARGET = os.getenv("EMBEDDING_ONNX_QUANTIZATION", "avx2")
+
+
+def load_torch_model(model_name: str, device: str = None):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def load_torch_int8_model(model_name: str):
+    """fp32 SentenceTransformer with its Linear layers dynamically quantized to int8"""
+    import torch
+    model = load_torch_model(model_name, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceEncoder:
+    """
+    Runs the exported transformer in ONNX Runtime and reproduces the sentence-transformers
+    pooling, so vectors keep the same 768 dimensions and stay comparable with stored ones.
+    """
+
+    def __init__(self, model, tokenizer, max_seq_length: int = 384, normalize: bool = True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.normalize = normalize
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.config.hidden_size
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+
+        batches = []
+        for i in range(0, len(sentences), batch_size):
+            batches.append(self._encode_batch(sentences[i:i + batch_size], normalize_embeddings))
+
+        if not batches:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        vectors = np.vstack(batches)
+        return vectors[0] if single else vectors
+
+    def _encode_batch(self, sentences: List[str], normalize_embeddings: bool) -> np.ndarray:
+        inputs = self.tokenizer(
+            sentences,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        outputs = self.model(**inputs)
+        token_embeddings = np.asarray(outputs.last_hidden_state, dtype=np.float32)
+
+        # Mean pooling over non-padding tokens, as in the sentence-transformers Pooling module
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        vectors = summed / counts
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.clip(norms, 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def load_onnx_int8_model(model_name: str) -> OnnxSentenceEncoder:
+    """Export the model to ONNX and quantize it once, then load the cached int8 graph"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+    quantized_dir = os.path.join(export_dir, "int8")
+    quantized_file = "model_quantized.onnx"
+
+    if not os.path.exists(os.path.join(quantized_dir, quantized_file)):
+        print(f"⏳ Exporting {model_name} to ONNX and quantizing to int8 ({ONNX_QUANTIZATION_TARGET})...")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+
+        quantization_config = getattr(AutoQuantizationConfig, ONNX_QUANTIZATION_TARGET)(is_static=False, per_channel=False)
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=quantization_config)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(quantized_dir)
+        print(f"✅ Quantized ONNX model saved to {quantized_dir}")
+
+    model = ORTModelForFeatureExtraction.from_pretrained(quantized_dir, file_name=quantized_file)
+    tokenizer = AutoTokenizer.from_pretrained(quantized_dir)
+    return OnnxSentenceEncoder(model, tokenizer)
+
+
+def load_embedding_model(model_name: str, backend: str = BACKEND_TORCH):
+    """Build the embedding model for the configured CPU inference backend"""
+    if backend == BACKEND_TORCH:
+        return load_torch_model(model_name)
+    if backend == BACKEND_TORCH_INT8:
+        return load_torch_int8_model(model_name)
+    if backend == BACKEND_ONNX_INT8:
+        return load_onnx_int8_model(model_name)
+    raise ValueError(f"Unknown embedding backend '{backend}'. Expected one of: {', '.join(BACKENDS)}")
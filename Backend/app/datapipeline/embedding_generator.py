@@ -1,14 +1,33 @@
-from app.config import llm, EMBEDDING_MODEL, Config
+from app.config import Config
 import os
+import queue
 import shutil
+import time
+import multiprocessing
+from collections import deque
 from app.datapipeline.text_extractor import extract_text
 from app.models.create_dbs import create_LanceDB
+from app.models.lance_utils import StoryIdIndex
+from app.models.lance_writer import get_writer
+from app.models.content_cache import encode_cached
+from app.datapipeline.chunk_index import index_story_chunks, truncate_for_embedding
+from app.LLM.summarizer import summarize_in_chunks, PENDING_SUMMARY, TWO_PHASE_INGESTION
 import lancedb
 from datetime import datetime
 
 UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "./data/uploaded_docs")
 SUCCESS_FOLDER = os.getenv("SUCCESS_FOLDER", "./data/success")
 FAILURE_FOLDER = os.getenv("FAILURE_FOLDER", "./data/failure")
+# Files encoded together and written to LanceDB with a single add
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+# PDF/DOCX parsing is CPU-bound; 0 or 1 worker extracts in-process
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "120"))  # seconds per file
+# Workers are never forked from the scheduler: its watcher and writer threads may hold locks at fork time
+EXTRACTION_START_METHOD = os.getenv(
+    "EXTRACTION_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
 db = lancedb.connect(Config.LANCE_DB_PATH)
 
 try:
@@ -17,31 +36,18 @@ except Exception as e:
     print(f"❌ Error opening table: {e}")
     table=create_LanceDB()
 
-def summarize_in_chunks(text, chunk_size=4000):
+story_writer = get_writer(Config.TABLE_NAME_LANCE, table)
+
+def load_story_id_index():
+    """Load the set of stored story IDs once per run (projects only the storyID column)"""
     try:
-        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
-        summaries = []
-        for chunk in chunks[:3]:  # Limit to 3 chunks for efficiency
-            prompt = (
-                "Summarize the following document section in 1 sentence:\n\n" + chunk
-            )
-            try:
-                response = llm.invoke(prompt)
-                summaries.append(response.content.strip())
-            except Exception as e:
-                summaries.append("[Summary failed for a chunk]")
-                print(f"❌ LLM failed on a chunk: {e}")
-        return " ".join(summaries)
+        return StoryIdIndex(table)
     except Exception as e:
-        print(f"❌ LLM summary failed: {e}")
-        return "Summary could not be generated."
-    
-def story_id_exists(table, story_id):
-    try:
-        result = table.to_pandas().query(f"storyID == '{story_id}'")
-        return not result.empty
-    except Exception:
-        return False
+        print(f"❌ Error loading story IDs: {e}")
+        return None
+
+def story_id_exists(story_ids, story_id):
+    return story_ids is not None and story_id in story_ids
 
 def ensure_project_folders(project_name):
     """Ensure success and failure folders exist for the project"""
@@ -54,11 +60,178 @@ def ensure_project_folders(project_name):
     
     return project_success_folder, project_failure_folder
 
-def process_project_folder(project_folder_path, project_name):
-    """Process all files in a project folder"""
+class ExtractionPool:
+    """
+    Worker processes that extract text for a whole ingestion run. Started on first use and
+    only replaced after a file exceeds the timeout (a stuck worker cannot be interrupted).
+    """
+
+    def __init__(self, max_workers=EXTRACTION_WORKERS, timeout=EXTRACTION_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _get_pool(self):
+        if self._pool is None:
+            context = multiprocessing.get_context(EXTRACTION_START_METHOD)
+            self._pool = context.Pool(processes=self.max_workers)
+        return self._pool
+
+    def _terminate(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def extract(self, file_paths):
+        """
+        Extract text from many files. Returns {file_path: text or None}; files that fail
+        or exceed the timeout map to None.
+        """
+        if self.max_workers <= 1 or len(file_paths) <= 1:
+            return {file_path: extract_text(file_path) for file_path in file_paths}
+
+        results = {}
+        queued = deque(file_paths)
+
+        while queued:
+            pool = self._get_pool()
+            finished = queue.Queue()
+            in_flight = {}  # file_path -> submitted_at
+            while queued or in_flight:
+                # Keep at most one file per worker in flight so submission time is start time
+                while queued and len(in_flight) < self.max_workers:
+                    file_path = queued.popleft()
+                    in_flight[file_path] = time.monotonic()
+                    pool.apply_async(
+                        extract_text, (file_path,),
+                        callback=lambda text, file_path=file_path: finished.put((file_path, text, None)),
+                        error_callback=lambda e, file_path=file_path: finished.put((file_path, None, e))
+                    )
+
+                next_deadline = min(in_flight.values()) + self.timeout
+                try:
+                    file_path, text, error = finished.get(timeout=max(0.0, next_deadline - time.monotonic()))
+                    in_flight.pop(file_path, None)
+                    if error is not None:
+                        print(f"❌ Error reading {file_path}: {error}")
+                    results[file_path] = text
+                except queue.Empty:
+                    pass
+
+                now = time.monotonic()
+                expired = [file_path for file_path, submitted in in_flight.items() if now - submitted >= self.timeout]
+                if expired:
+                    for file_path in expired:
+                        in_flight.pop(file_path)
+                        print(f"⏱️ Extraction of {file_path} exceeded {self.timeout:.0f}s — skipping.")
+                        results[file_path] = None
+                    # Replace the pool (and its stuck worker) and retry the files that were still running
+                    for file_path in in_flight:
+                        queued.appendleft(file_path)
+                    self._terminate()
+                    break
+
+        return results
+
+def move_file(file_path, target_folder):
+    """Move a processed file into its project's success or failure folder"""
+    shutil.move(file_path, os.path.join(target_folder, os.path.basename(file_path)))
+
+def build_story_row(project_name, story_id, file, file_path, text, story_description, embedding):
+    return {
+        "project_id": project_name,
+        "vector": embedding,
+        "storyID": story_id,
+        "storyDescription": story_description,
+        "test_case_content": "",
+        "filename": file,
+        "original_path": file_path,
+        "doc_content_text": text,
+        "embedding_timestamp": datetime.now(),
+        "source": "file"
+    }
+
+def store_batch(pending, project_name, project_success_folder, project_failure_folder, story_ids, counts):
+    """
+    Encode a batch of prepared files with one call and hand the rows to the shared buffered writer.
+    Files are moved and counted once the flush that contains their rows has finished.
+    """
+    if not pending:
+        return
+
+    try:
+        embeddings = encode_cached(
+            [truncate_for_embedding(item["text"]) for item in pending],
+            batch_size=len(pending)
+        )
+    except Exception as e:
+        print(f"❌ Embedding generation failed for a batch of {len(pending)} files: {e}")
+        for item in pending:
+            move_file(item["file_path"], project_failure_folder)
+        counts["failed"] += len(pending)
+        return
+
+    rows = []
+    for item, embedding in zip(pending, embeddings):
+        embedding = embedding.tolist()
+        print(f"🔢 Vector length: {len(embedding)} for {item['file']}")
+        rows.append(build_story_row(
+            project_name, item["story_id"], item["file"], item["file_path"],
+            item["text"], item["story_description"], embedding
+        ))
+
+    def on_flushed(success, error):
+        if not success:
+            print(f"❌ Error storing batch of {len(rows)} files: {error}")
+            for item in pending:
+                move_file(item["file_path"], project_failure_folder)
+            counts["failed"] += len(pending)
+            return
+
+        if story_ids is not None:
+            story_ids.add(item["story_id"] for item in pending)
+
+        # Per-chunk vectors let long documents match on more than their first page
+        try:
+            chunk_count = index_story_chunks([
+                {"storyID": item["story_id"], "project_id": project_name, "text": item["text"]}
+                for item in pending
+            ])
+            print(f"🧩 Indexed {chunk_count} chunks for {len(pending)} stories")
+        except Exception as e:
+            print(f"⚠️ Chunk indexing failed for batch: {e}")
+
+        for item in pending:
+            move_file(item["file_path"], project_success_folder)
+            print(f"✅ Stored {item['file']} in LanceDB and moved to {project_name}/success.")
+        counts["success"] += len(pending)
+
+    story_writer.add(rows, on_flushed)
+
+def process_project_folder(project_folder_path, project_name, story_ids=None, files=None, pool=None):
+    """
+    Process all files in a project folder, or only `files` (names inside it) when given.
+    `pool` is the run's ExtractionPool; a temporary one is used when none is passed.
+    """
+    if pool is None:
+        with ExtractionPool() as pool:
+            return process_project_folder(project_folder_path, project_name, story_ids, files, pool)
+
     files_processed = 0
-    files_success = 0
-    files_failed = 0
+    # Updated by store_batch once rows are flushed
+    counts = {"success": 0, "failed": 0}
     
     print(f"📁 Processing project: {project_name}")
     
@@ -67,66 +240,77 @@ def process_project_folder(project_folder_path, project_name):
     
     # Get all files in the project folder
     try:
-        files = [f for f in os.listdir(project_folder_path) if os.path.isfile(os.path.join(project_folder_path, f))]
+        if files is None:
+            files = os.listdir(project_folder_path)
+        files = [f for f in files if os.path.isfile(os.path.join(project_folder_path, f))]
     except Exception as e:
         print(f"❌ Error reading project folder {project_name}: {e}")
         return 0, 0, 0
     
-    for file in files:
-        file_path = os.path.join(project_folder_path, file)
-        files_processed += 1
-        
-        print(f"📄 Processing {file} in project {project_name}...")
+    if story_ids is None:
+        story_ids = load_story_id_index()
 
-        text = extract_text(file_path)
+    # Story IDs claimed earlier in this run (e.g. story.pdf and story.docx in the same folder)
+    claimed_ids = set()
 
-        if not text:
-            print(f"❌ Skipping {file} — couldn't extract text.")
-            shutil.move(file_path, os.path.join(project_failure_folder, file))
-            files_failed += 1
-            continue
+    for batch_start in range(0, len(files), INGEST_BATCH_SIZE):
+        pending = []
+        batch_files = files[batch_start:batch_start + INGEST_BATCH_SIZE]
+        texts = pool.extract([os.path.join(project_folder_path, file) for file in batch_files])
 
-        try:
-            story_id = os.path.splitext(file)[0]
+        # Extract text and summaries for the whole batch before encoding it
+        for file in batch_files:
+            file_path = os.path.join(project_folder_path, file)
+            files_processed += 1
+            
+            print(f"📄 Processing {file} in project {project_name}...")
 
-            if story_id_exists(table, story_id):
-                print(f"⚠️ Skipping {file} — storyID '{story_id}' already exists.")
-                shutil.move(file_path, os.path.join(project_failure_folder, file))
-                files_failed += 1
-                continue
+            text = texts.get(file_path)
 
-            story_description = summarize_in_chunks(text)
+            if not text:
+                print(f"❌ Skipping {file} — couldn't extract text.")
+                move_file(file_path, project_failure_folder)
+                counts["failed"] += 1
+                continue
 
             try:
-                embedding = EMBEDDING_MODEL.encode(text).tolist()
+                story_id = os.path.splitext(file)[0]
+
+                if story_id in claimed_ids or story_id_exists(story_ids, story_id):
+                    print(f"⚠️ Skipping {file} — storyID '{story_id}' already exists.")
+                    move_file(file_path, project_failure_folder)
+                    counts["failed"] += 1
+                    continue
+
+                claimed_ids.add(story_id)
+                pending.append({
+                    "file": file,
+                    "file_path": file_path,
+                    "story_id": story_id,
+                    "text": text,
+                    # Two-phase mode leaves the LLM summary to fill_pending_summaries
+                    "story_description": PENDING_SUMMARY if TWO_PHASE_INGESTION else summarize_in_chunks(text)
+                })
             except Exception as e:
-                print(f"❌ Embedding generation failed for {file}: {e}")
-                shutil.move(file_path, os.path.join(project_failure_folder, file))
-                files_failed += 1
-                continue
+                print(f"❌ Error preparing {file}: {e}")
+                move_file(file_path, project_failure_folder)
+                counts["failed"] += 1
 
-            print(f"🔢 Vector length: {len(embedding)} for {file}")
-
-            table.add([{
-                "project_id": project_name,
-                "vector": embedding,
-                "storyID": story_id,
-                "storyDescription": story_description,
-                "test_case_content": "",
-                "filename": file,
-                "original_path": file_path,
-                "doc_content_text": text,
-                "embedding_timestamp": datetime.now(),
-                "source": "file"
-            }])
-
-            shutil.move(file_path, os.path.join(project_success_folder, file))
-            print(f"✅ Stored {file} in LanceDB and moved to {project_name}/success.")
-            files_success += 1
-        except Exception as e:
-            print(f"❌ Error storing {file}: {e}")
-            shutil.move(file_path, os.path.join(project_failure_folder, file))
-            files_failed += 1
+        store_batch(pending, project_name, project_success_folder, project_failure_folder, story_ids, counts)
+        if TWO_PHASE_INGESTION:
+            # Make each batch searchable right away rather than at the end of the project
+            try:
+                story_writer.flush()
+            except Exception:
+                pass  # Reported by the writer; the batch's files were moved to failure
+
+    # Write whatever is still buffered so every file of this project is settled before returning
+    try:
+        story_writer.flush()
+    except Exception:
+        pass  # Already reported and the affected files moved by the flush callbacks
+
+    files_success, files_failed = counts["success"], counts["failed"]
     
     print(f"📊 [Project {project_name}] Summary: {files_processed} files processed, {files_success} successful, {files_failed} failed")
     return files_processed, files_success, files_failed
@@ -162,19 +346,24 @@ def generate_embeddings():
         
         print(f"📁 Found {len(project_folders)} project folders: {', '.join(project_folders)}")
         
-        for project_folder in project_folders:
-            project_path = os.path.join(UPLOAD_FOLDER, project_folder)
-            
-            # Process each project folder
-            files_processed, files_success, files_failed = process_project_folder(project_path, project_folder)
-            
-            total_files_processed += files_processed
-            total_files_success += files_success
-            total_files_failed += files_failed
-            projects_processed += 1
-            
-            print(f"✅ Completed project: {project_folder}")
-            print("-" * 50)
+        # Loaded once for the whole run and kept up to date as stories are added
+        story_ids = load_story_id_index()
+
+        # One set of extraction workers for every project in this run
+        with ExtractionPool() as pool:
+            for project_folder in project_folders:
+                project_path = os.path.join(UPLOAD_FOLDER, project_folder)
+                
+                # Process each project folder
+                files_processed, files_success, files_failed = process_project_folder(project_path, project_folder, story_ids, pool=pool)
+                
+                total_files_processed += files_processed
+                total_files_success += files_success
+                total_files_failed += files_failed
+                projects_processed += 1
+                
+                print(f"✅ Completed project: {project_folder}")
+                print("-" * 50)
         
         print(f"🎉 [Overall Summary] {projects_processed} projects processed")
         print(f"📊 Total files: {total_files_processed} processed, {total_files_success} successful, {total_files_failed} failed")
@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# inotify (through watchdog) when installed, otherwise a cheap stat-only polling loop
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# A file is handed to ingestion once its size and mtime have not changed for this long
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "2"))
+# How often pending files are re-checked (and, without watchdog, folders re-listed)
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "1"))
+# Editors and browsers write to these names first and rename when the file is complete
+TEMPORARY_SUFFIXES = (".part", ".tmp", ".crdownload", ".partial", "~")
+
+FilesCallback = Callable[[str, List[str]], None]
+
+
+def _is_temporary(file_name: str) -> bool:
+    return file_name.startswith((".", "~$")) or file_name.endswith(TEMPORARY_SUFFIXES)
+
+
+if WATCHDOG_AVAILABLE:
+    class _UploadEventHandler(FileSystemEventHandler):
+        def __init__(self, watcher):
+            self.watcher = watcher
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.watcher.mark(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.watcher.mark(event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self.watcher.forget(event.src_path)
+                self.watcher.mark(event.dest_path)
+
+        def on_deleted(self, event):
+            if not event.is_directory:
+                self.watcher.forget(event.src_path)
+
+
+class UploadFolderWatcher:
+    """
+    Watches UPLOAD_FOLDER/<project>/ and calls on_files(project_name, file_names) for files
+    that have finished being written. Partial writes are debounced: a file is only reported
+    after its size and mtime stay the same for settle_seconds.
+    """
+
+    def __init__(self, upload_folder: str, on_files: FilesCallback,
+                 settle_seconds: float = WATCH_SETTLE_SECONDS, poll_interval: float = WATCH_POLL_INTERVAL,
+                 use_watchdog: Optional[bool] = None):
+        self.upload_folder = os.path.abspath(upload_folder)
+        self.on_files = on_files
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.use_watchdog = WATCHDOG_AVAILABLE if use_watchdog is None else use_watchdog and WATCHDOG_AVAILABLE
+        # path -> (size, mtime, time the current size/mtime was first seen)
+        self._pending: Dict[str, Tuple[int, float, float]] = {}
+        # path -> (size, mtime) already handed over, so a file left in place is not ingested twice
+        self._reported: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer = None
+
+    def mark(self, path: str):
+        """Record a file that was created or changed; it is checked again on the next tick"""
+        path = os.path.abspath(path)
+        relative = os.path.relpath(path, self.upload_folder)
+        parts = relative.split(os.sep)
+        # Only files directly inside a project folder are stories
+        if len(parts) != 2 or _is_temporary(parts[1]):
+            return
+        with self._lock:
+            self._pending.setdefault(path, (-1, -1.0, time.monotonic()))
+
+    def forget(self, path: str):
+        """A file left the folder (ingested files are moved to success/failure)"""
+        with self._lock:
+            self._reported.pop(os.path.abspath(path), None)
+
+    def scan(self):
+        """List every project folder once; used at startup and as the polling fallback"""
+        try:
+            projects = [entry for entry in os.scandir(self.upload_folder) if entry.is_dir()]
+        except FileNotFoundError:
+            return
+        seen = set()
+        for project in projects:
+            try:
+                for entry in os.scandir(project.path):
+                    if entry.is_file():
+                        seen.add(os.path.abspath(entry.path))
+                        self.mark(entry.path)
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            for path in set(self._reported) - seen:
+                del self._reported[path]
+
+    def collect_ready(self) -> Dict[str, List[str]]:
+        """Re-stat pending files and return the settled ones grouped by project"""
+        now = time.monotonic()
+        ready = defaultdict(list)
+        with self._lock:
+            for path, (size, mtime, since) in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    del self._pending[path]  # Moved away or deleted before it settled
+                    continue
+                if (stat.st_size, stat.st_mtime) != (size, mtime):
+                    self._pending[path] = (stat.st_size, stat.st_mtime, now)
+                elif now - since >= self.settle_seconds:
+                    del self._pending[path]
+                    if self._reported.get(path) == (size, mtime):
+                        continue
+                    self._reported[path] = (size, mtime)
+                    project_dir, file_name = os.path.split(path)
+                    ready[os.path.basename(project_dir)].append(file_name)
+        return dict(ready)
+
+    def tick(self):
+        if not self.use_watchdog:
+            self.scan()
+        for project_name, files in self.collect_ready().items():
+            try:
+                self.on_files(project_name, sorted(files))
+            except Exception as e:
+                print(f"❌ [Watcher] Ingestion failed for project {project_name}: {e}")
+
+    def start(self):
+        """Start watching in a background thread"""
+        os.makedirs(self.upload_folder, exist_ok=True)
+        if self.use_watchdog:
+            self._observer = Observer()
+            self._observer.schedule(_UploadEventHandler(self), self.upload_folder, recursive=True)
+            self._observer.start()
+        # Files dropped while nothing was watching
+        self.scan()
+
+        mode = "inotify/watchdog" if self.use_watchdog else f"polling every {self.poll_interval}s"
+        print(f"👀 [Watcher] Watching {self.upload_folder} ({mode})")
+
+        thread = threading.Thread(target=self._run, name="upload-folder-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.tick()
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
@@ -0,0 +1,92 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import lancedb
+import pyarrow as pa
+from app.config import Config
+from app.models.lance_utils import read_columns, sql_literal, in_filter
+from app.LLM.summarizer import PENDING_SUMMARY, summarize_in_chunks, summarize_jira_story
+
+# Stories summarized per call and how many of them are sent to the LLM at once
+SUMMARY_BACKFILL_BATCH = int(os.getenv("SUMMARY_BACKFILL_BATCH", "50"))
+SUMMARY_BACKFILL_CONCURRENCY = int(os.getenv("SUMMARY_BACKFILL_CONCURRENCY", "4"))
+
+def pending_summary_filter() -> str:
+    return f"storyDescription = {sql_literal(PENDING_SUMMARY)}"
+
+def _summarize(story):
+    text = story.get("doc_content_text") or ""
+    if story.get("source") == "jira":
+        return summarize_jira_story(text)
+    return summarize_in_chunks(text)
+
+def fill_pending_summaries(limit: int = SUMMARY_BACKFILL_BATCH, table=None) -> int:
+    """
+    Second phase of two-phase ingestion: summarize stories stored with PENDING_SUMMARY
+    and write their storyDescription. Returns the number of stories updated.
+    """
+    if table is None:
+        table = lancedb.connect(Config.LANCE_DB_PATH).open_table(Config.TABLE_NAME_LANCE)
+
+    stories = read_columns(
+        table, ["storyID", "source", "doc_content_text"], where=pending_summary_filter(), limit=limit
+    ).to_pylist()
+    if not stories:
+        return 0
+
+    print(f"📝 Summarizing {len(stories)} stories ingested without a summary...")
+    with ThreadPoolExecutor(max_workers=max(1, SUMMARY_BACKFILL_CONCURRENCY)) as executor:
+        summaries = list(executor.map(_summarize, stories))
+
+    try:
+        updated = write_summaries(table, dict(zip((story["storyID"] for story in stories), summaries)))
+    except Exception as e:
+        print(f"❌ Could not store {len(stories)} summaries: {e}")
+        return 0
+
+    print(f"✅ Filled in {updated} pending summaries")
+    return updated
+
+def write_summaries(table, summaries: dict) -> int:
+    """
+    Set storyDescription for a batch of still-pending stories in one write (one new
+    fragment), instead of one update and table version per story.
+    """
+    where = f"{pending_summary_filter()} AND {in_filter('storyID', summaries.keys())}"
+    rows = table.to_lance().to_table(filter=where)
+    if rows.num_rows == 0:
+        return 0
+
+    index = rows.schema.get_field_index("storyDescription")
+    descriptions = pa.array(
+        [summaries[story_id] for story_id in rows.column("storyID").to_pylist()],
+        type=rows.schema.field(index).type
+    )
+    rows = rows.set_column(index, "storyDescription", descriptions)
+
+    if hasattr(table, "merge_insert"):
+        table.merge_insert("storyID").when_matched_update_all().execute(rows)
+    else:
+        # Older LanceDB: add the summarized rows first, then delete the still-pending originals
+        # (the new rows no longer match `where`), so a failed add loses nothing
+        table.add(rows)
+        table.delete(where)
+    return rows.num_rows
+
+def fill_all_pending_summaries() -> int:
+    """Run fill_pending_summaries until no pending stories are left"""
+    total = 0
+    while True:
+        updated = fill_pending_summaries()
+        total += updated
+        if updated < SUMMARY_BACKFILL_BATCH:
+            return total
+
+if __name__ == "__main__":
+    fill_all_pending_summaries()
@@ -1,19 +1,52 @@
+import os
 import fitz
 from docx2python import docx2python
 
-def extract_text(file_path):
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+# Caps keep a huge vendor PDF from producing a giant string; 0 disables a cap
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "300")) or None
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "500000")) or None
+TXT_READ_BLOCK = 64 * 1024
+
+def _iter_raw_text(file_path, max_pages=None):
+    if file_path.endswith(".pdf"):
+        with fitz.open(file_path) as doc:
+            for page_number, page in enumerate(doc):
+                if max_pages is not None and page_number >= max_pages:
+                    print(f"⚠️ {os.path.basename(file_path)}: EXTRACT_MAX_PAGES reached, "
+                          f"using the first {max_pages} of {len(doc)} pages")
+                    break
+                # Same separator as joining all pages with "\n"
+                yield page.get_text() if page_number == 0 else "\n" + page.get_text()
+    elif file_path.endswith(".docx"):
+        with docx2python(file_path) as doc:
+            yield doc.text
+    elif file_path.endswith(".txt"):
+        with open(file_path, "r", encoding="utf-8") as f:
+            while True:
+                block = f.read(TXT_READ_BLOCK)
+                if not block:
+                    break
+                yield block
+
+def _iter_capped_text(file_path, max_pages, max_chars):
+    """Raw text pieces (one PDF page at a time), stopping after max_pages pages or max_chars characters"""
+    emitted = 0
+    for piece in _iter_raw_text(file_path, max_pages):
+        if max_chars is not None and emitted + len(piece) > max_chars:
+            print(f"⚠️ {os.path.basename(file_path)}: EXTRACT_MAX_CHARS reached, "
+                  f"text truncated to {max_chars} characters")
+            yield piece[:max_chars - emitted]
+            return
+        emitted += len(piece)
+        yield piece
+
+def extract_text(file_path, max_pages=EXTRACT_MAX_PAGES, max_chars=EXTRACT_MAX_CHARS):
     try:
-        if file_path.endswith(".pdf"):
-            with fitz.open(file_path) as doc:
-                return "\n".join(page.get_text() for page in doc)
-        elif file_path.endswith(".docx"):
-            with docx2python(file_path) as doc:
-                return doc.text
-        elif file_path.endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        else:
+        if not file_path.endswith(SUPPORTED_EXTENSIONS):
             return None
+        return "".join(_iter_capped_text(file_path, max_pages, max_chars))
     except Exception as e:
         print(f"❌ Error reading {file_path}: {e}")
-        return None
\ No newline at end of file
+        return None
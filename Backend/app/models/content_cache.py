@@ -0,0 +1,218 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+from app.config import EMBEDDING_MODEL, EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, LLM_MODEL_NAME
+
+# Vectors and summaries of text seen before are reused instead of recomputed
+CONTENT_CACHE_ENABLED = os.getenv("CONTENT_CACHE_ENABLED", "true").lower() == "true"
+CONTENT_CACHE_PATH = os.getenv("CONTENT_CACHE_PATH", "./data/content_cache.sqlite")
+CONTENT_CACHE_TTL_DAYS = float(os.getenv("CONTENT_CACHE_TTL_DAYS", "90"))  # 0 = never expire
+CONTENT_CACHE_MAX_MB = float(os.getenv("CONTENT_CACHE_MAX_MB", "1024"))
+# Expiry and size eviction run on open and after this many stored entries
+EVICT_EVERY_PUTS = 1000
+
+# Quantized backends produce slightly different vectors, so the backend is part of the key
+EMBEDDING_CACHE_MODEL = f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}"
+SUMMARY_CACHE_MODEL = LLM_MODEL_NAME
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-exports that only differ in line breaks share a key"""
+    return " ".join(text.split())
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ContentCache:
+    """
+    SQLite store of embedding vectors and summaries keyed by content hash and model.
+    Entries expire after ttl_days, and the oldest are evicted once the stored data
+    passes max_mb.
+    """
+
+    def __init__(self, path: str = CONTENT_CACHE_PATH, ttl_days: float = CONTENT_CACHE_TTL_DAYS,
+                 max_mb: float = CONTENT_CACHE_MAX_MB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        with self._lock, self._conn:
+            # WAL lets the web app and the scheduler use the same file
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "content_hash TEXT, model TEXT, vector BLOB, created_at REAL, "
+                "PRIMARY KEY (content_hash, model))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "content_hash TEXT, model TEXT, summary TEXT, created_at REAL, "
+                "PRIMARY KEY (content_hash, model))"
+            )
+        self.evict()
+
+    def _min_created_at(self) -> float:
+        """Oldest created_at still within the TTL (0 when entries never expire)"""
+        return time.time() - self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    def get_vectors(self, hashes: Iterable[str], model: str) -> Dict[str, np.ndarray]:
+        hashes = list(set(hashes))
+        found = {}
+        min_created_at = self._min_created_at()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT content_hash, vector FROM embeddings WHERE model = ? AND created_at >= ? "
+                    f"AND content_hash IN ({','.join('?' * len(batch))})",
+                    [model, min_created_at, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_vectors(self, vectors: Dict[str, np.ndarray], model: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in vectors.items()]
+            )
+        self._count_puts(len(vectors))
+
+    def get_summary(self, key: str, model: str) -> Optional[str]:
+        min_created_at = self._min_created_at()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE content_hash = ? AND model = ? AND created_at >= ?",
+                (key, model, min_created_at)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put_summary(self, key: str, model: str, summary: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?)", (key, model, summary, time.time())
+            )
+        self._count_puts(1)
+
+    def _count_puts(self, count: int):
+        with self._lock:
+            before = self._puts
+            self._puts += count
+            due = self._puts // EVICT_EVERY_PUTS > before // EVICT_EVERY_PUTS
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the oldest ones (vectors and summaries alike) until under max_bytes"""
+        removed = 0
+        with self._lock, self._conn:
+            if self.ttl_seconds > 0:
+                cutoff = time.time() - self.ttl_seconds
+                for table in ("embeddings", "summaries"):
+                    removed += self._conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (cutoff,)).rowcount
+            total = self._conn.execute(
+                "SELECT (SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings) + "
+                "(SELECT COALESCE(SUM(LENGTH(summary)), 0) FROM summaries)"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                cutoff = None
+                rows = self._conn.execute(
+                    "SELECT created_at, LENGTH(vector) FROM embeddings "
+                    "UNION ALL SELECT created_at, LENGTH(summary) FROM summaries ORDER BY created_at"
+                )
+                for created_at, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    cutoff = created_at
+                    total -= size or 0
+                if cutoff is not None:
+                    for table in ("embeddings", "summaries"):
+                        removed += self._conn.execute(f"DELETE FROM {table} WHERE created_at <= ?", (cutoff,)).rowcount
+        return removed
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[ContentCache] = None
+_cache_lock = threading.Lock()
+
+def get_content_cache() -> Optional[ContentCache]:
+    """Process-wide cache, or None when disabled or the file cannot be opened"""
+    global _cache, CONTENT_CACHE_ENABLED
+    if not CONTENT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ContentCache()
+            except Exception as e:
+                print(f"⚠️ Content cache disabled, could not open {CONTENT_CACHE_PATH}: {e}")
+                CONTENT_CACHE_ENABLED = False
+                return None
+        return _cache
+
+def encode_cached(texts, model=None, **encode_kwargs):
+    """
+    Drop-in for model.encode(texts) that only encodes texts whose vectors are not cached yet.
+    Accepts a single string or a list, like SentenceTransformer.encode.
+    """
+    if model is None:
+        model = EMBEDDING_MODEL
+    cache = get_content_cache()
+    if cache is None:
+        return model.encode(texts, **encode_kwargs)
+
+    single = isinstance(texts, str)
+    if single:
+        texts = [texts]
+    if not texts:
+        return model.encode(texts, **encode_kwargs)
+
+    hashes = [content_hash(text) for text in texts]
+    vectors = cache.get_vectors(hashes, EMBEDDING_CACHE_MODEL)
+
+    missing = {}
+    for key, text in zip(hashes, texts):
+        if key not in vectors and key not in missing:
+            missing[key] = text
+    if missing:
+        encoded = model.encode(list(missing.values()), **encode_kwargs)
+        new_vectors = dict(zip(missing.keys(), encoded))
+        cache.put_vectors(new_vectors, EMBEDDING_CACHE_MODEL)
+        vectors.update(new_vectors)
+
+    result = np.stack([np.asarray(vectors[key], dtype=np.float32) for key in hashes])
+    return result[0] if single else result
+
+def get_cached_summary(text: str, kind: str) -> Optional[str]:
+    """Summary previously stored for this text; `kind` separates differently prompted summaries"""
+    cache = get_content_cache()
+    if cache is None:
+        return None
+    return cache.get_summary(content_hash(text), f"{kind}:{SUMMARY_CACHE_MODEL}")
+
+def put_cached_summary(text: str, kind: str, summary: str):
+    cache = get_content_cache()
+    if cache is not None:
+        cache.put_summary(content_hash(text), f"{kind}:{SUMMARY_CACHE_MODEL}", summary)
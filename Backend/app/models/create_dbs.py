@@ -26,11 +26,26 @@ schema = pa.schema([
     ("source", pa.string())
 ])
 
+CHUNK_TABLE_NAME = Config.TABLE_NAME_LANCE_CHUNKS
+chunk_schema = pa.schema([
+    ("storyID", pa.string()),
+    ("project_id", pa.string()),
+    ("chunk_index", pa.int32()),
+    ("vector", pa.list_(pa.float32(), 768)),
+    ("chunk_text", pa.string()),
+    ("embedding_timestamp", pa.timestamp("us"))
+])
+
 def create_LanceDB():
     table = db.create_table(TABLE_NAME, schema=schema, exist_ok=True)
     print(f"✅ Table '{TABLE_NAME}' is ready.")
     return table
 
+def create_chunk_table():
+    table = db.create_table(CHUNK_TABLE_NAME, schema=chunk_schema, exist_ok=True)
+    print(f"✅ Table '{CHUNK_TABLE_NAME}' is ready.")
+    return table
+
 def create_postgres_db():
     try:
         # First try to connect to default postgres database to create our database if it doesn't exist
@@ -294,6 +309,7 @@ if __name__ == "__main__":
     print("\n🚀 Setting up database structures...")
     print("\n1️⃣ Creating LanceDB table...")
     create_LanceDB()
+    create_chunk_table()
 
     print("\n2️⃣ Setting up PostgreSQL structures...")
     create_postgres_db()
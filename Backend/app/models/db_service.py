@@ -1,3 +1,4 @@
+import threading
 import psycopg2
 import lancedb
 import json
@@ -5,10 +6,19 @@ from typing import Dict, Any, List, Optional
 import pandas as pd
 import numpy as np
 from app.config import Config
+from app.datapipeline.chunk_index import open_chunk_table, search_chunks
+from app.models.vector_index import vector_search
+from app.models.lance_utils import read_stories_by_ids, get_story_row, story_exists, scope_filter
+from app.models.project_catalog import project_catalog
 import psycopg2.extras
 
+# Columns returned by get_story; the vector is never read
+STORY_DETAIL_COLUMNS = ['storyID', 'storyDescription', 'doc_content_text', 'embedding_timestamp', 'project_id', 'source']
+
 class DatabaseService:
     _instance = None
+    # Held while the singleton is built, so concurrent first callers don't each create one
+    _instance_lock = threading.Lock()
     
     def __init__(self, postgres_config: Dict[str, Any], lance_db_path: str):
         """Initialize database connections"""
@@ -35,83 +45,92 @@ class DatabaseService:
         Sorted by test_case_created_time (most recent first by default).
         """
         try:
-            # Get stories from LanceDB
+            # Story IDs come from the version-cached catalog; LanceDB is only re-read after a write
             stories_table = self.lance_db.open_table(self.TABLE_NAME_LANCE)
-            lance_stories = stories_table.to_pandas()
+            story_ids = project_catalog.story_ids(stories_table, project_id)
 
-            # Filter by project_id if provided
+            # Stories with test cases sort first (NULLS LAST either way), so Postgres pages them on
+            # its own, filtered by project; no story ID list is sent
+            latest_conditions = []
+            latest_params = []
             if project_id:
-                lance_stories = lance_stories[lance_stories['project_id'] == project_id]
+                latest_conditions.append("project_id = %s")
+                latest_params.append(project_id)
+            date_conditions = []
+            date_params = []
+            if from_date:
+                date_conditions.append("created_on >= %s")
+                date_params.append(from_date)
+            if to_date:
+                date_conditions.append("created_on <= %s")
+                date_params.append(to_date)
+            latest_where = f"WHERE {' AND '.join(latest_conditions)}" if latest_conditions else ""
+            where_clause = f"WHERE {' AND '.join(date_conditions)}" if date_conditions else ""
+            direction = 'ASC' if sort_order.lower() == 'asc' else 'DESC'
+
+            latest = f"""
+                SELECT * FROM (
+                    SELECT DISTINCT ON (story_id) story_id, created_on, total_test_cases, source
+                    FROM test_cases
+                    {latest_where}
+                    ORDER BY story_id, created_on DESC NULLS LAST
+                ) AS latest
+                {where_clause}
+            """
+            latest_params = [*latest_params, *date_params]
+            offset = (page - 1) * per_page
 
-            # Get all stories with their test case creation times for sorting
-            story_ids = lance_stories['storyID'].tolist()
-            created_on_map = {}
-            test_case_times_map = {}
-            test_case_count_map = {}
-            test_case_source_map = {}
-            
             with psycopg2.connect(**self.postgres_config) as conn:
                 with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT story_id, created_on, total_test_cases, source
-                        FROM test_cases 
-                        WHERE story_id = ANY(%s)
-                        ORDER BY created_on DESC NULLS LAST
-                    """, (story_ids,))
-                    for row in cur.fetchall():
-                        story_id, created_on, total_test_cases, source = row
-                        if story_id not in created_on_map:
-                            created_on_map[story_id] = created_on
-                            test_case_times_map[story_id] = created_on  # Use created_on as last updated time
-                            test_case_count_map[story_id] = total_test_cases
-                            test_case_source_map[story_id] = source
-
-            # Add created_on and test_case_created_time to LanceDB data
-            lance_stories['created_on'] = lance_stories['storyID'].map(created_on_map)
-            lance_stories['test_case_created_time'] = lance_stories['storyID'].map(test_case_times_map)
-            lance_stories['total_test_cases'] = lance_stories['storyID'].map(test_case_count_map)
-            lance_stories['test_case_source'] = lance_stories['storyID'].map(test_case_source_map)
+                    cur.execute(f"SELECT COUNT(*) FROM ({latest}) AS counted", latest_params)
+                    generated_total = cur.fetchone()[0]
 
-            # Filter by date range if provided
-            if from_date:
-                lance_stories = lance_stories[lance_stories['created_on'] >= from_date]
-            if to_date:
-                lance_stories = lance_stories[lance_stories['created_on'] <= to_date]
+                    page_rows = []
+                    if offset < generated_total:
+                        cur.execute(
+                            latest + f" ORDER BY created_on {direction} NULLS LAST, story_id ASC LIMIT %s OFFSET %s",
+                            [*latest_params, per_page, offset]
+                        )
+                        page_rows = cur.fetchall()
 
-            # Sort by test_case_created_time based on sort_order
-            ascending = sort_order.lower() == 'asc'
-            lance_stories = lance_stories.sort_values(
-                by=['test_case_created_time', 'storyID'], 
-                ascending=[ascending, True], 
-                na_position='last'
-            )
+                    if date_conditions:
+                        # A date filter only matches stories that have test cases
+                        total_stories = generated_total
+                    else:
+                        total_stories = max(generated_total, len(story_ids))
+                        if len(page_rows) < per_page and offset + len(page_rows) < total_stories:
+                            # Tail pages: stories without test cases, in storyID order
+                            cur.execute(f"SELECT DISTINCT story_id FROM test_cases {latest_where}", latest_params[:len(latest_conditions)])
+                            generated = {row[0] for row in cur.fetchall()}
+                            pending = sorted(story_id for story_id in story_ids if story_id not in generated)
+                            start = max(0, offset - generated_total)
+                            page_rows.extend(
+                                (story_id, None, None, None)
+                                for story_id in pending[start:start + per_page - len(page_rows)]
+                            )
 
-            # Calculate pagination
-            total_stories = len(lance_stories)
             total_pages = (total_stories + per_page - 1) // per_page
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
 
-            # Get paginated stories
-            paginated_stories = lance_stories.iloc[start_idx:end_idx]
+            # LanceDB columns for the stories on this page only
+            lance_rows = read_stories_by_ids(
+                stories_table, [row[0] for row in page_rows], ['storyDescription', 'project_id', 'source']
+            )
 
             stories = []
-            for _, lance_story in paginated_stories.iterrows():
-                story_id = lance_story['storyID']
-                test_case_created_time = lance_story['test_case_created_time']
-                test_case_count = lance_story.get('total_test_cases', 0)
+            for story_id, test_case_created_time, test_case_count, test_case_source in page_rows:
+                lance_story = lance_rows.get(story_id, {})
                 
                 stories.append({
                     'id': story_id,
-                    'description': lance_story['storyDescription'],
-                    'document_content': lance_story.get('document_content', None),
+                    'description': lance_story.get('storyDescription'),
+                    'document_content': None,
                     'test_case_count': test_case_count if test_case_count is not None else 0,
                     'download_link': f'/api/stories/download/{story_id}',
                     'test_case_created_time': test_case_created_time.isoformat() if test_case_created_time else None,
-                    'project_id': lance_story['project_id'],
+                    'project_id': lance_story.get('project_id'),
                     'source': {
-                        'story': lance_story.get('source', 'backend'),
-                        'test_cases': lance_story.get('test_case_source', 'backend')
+                        'story': lance_story.get('source') or 'backend',
+                        'test_cases': test_case_source or 'backend'
                     }
                 })
 
@@ -135,12 +154,11 @@ class DatabaseService:
     def get_story(self, story_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific story by ID from both LanceDB and PostgreSQL"""
         try:
-            # Get story from LanceDB
+            # Point lookup in LanceDB (storyID scalar index, only the columns we return)
             stories_table = self.lance_db.open_table(self.TABLE_NAME_LANCE)
-            story_data = stories_table.to_pandas()
-            lance_story = story_data[story_data['storyID'] == story_id]
+            lance_story = get_story_row(stories_table, story_id, STORY_DETAIL_COLUMNS)
             
-            if lance_story.empty:
+            if lance_story is None:
                 print(f"Story not found in LanceDB: {story_id}")
                 return None
             
@@ -158,26 +176,25 @@ class DatabaseService:
                 
             # Get embedding_timestamp from LanceDB
             embedding_timestamp = None
-            if 'embedding_timestamp' in lance_story.columns:
-                ts = lance_story['embedding_timestamp'].iloc[0]
-                if ts:
-                    if hasattr(ts, 'isoformat'):
-                        embedding_timestamp = ts.isoformat()
-                    else:
-                        from dateutil import parser
-                        embedding_timestamp = parser.parse(ts).isoformat()
+            ts = lance_story.get('embedding_timestamp')
+            if ts:
+                if hasattr(ts, 'isoformat'):
+                    embedding_timestamp = ts.isoformat()
+                else:
+                    from dateutil import parser
+                    embedding_timestamp = parser.parse(ts).isoformat()
                     
             return {
                 'id': story_id,
-                'description': lance_story['storyDescription'].iloc[0],
-                'document_content': lance_story['doc_content_text'].iloc[0] if 'doc_content_text' in lance_story.columns else None,
+                'description': lance_story['storyDescription'],
+                'document_content': lance_story.get('doc_content_text'),
                 'test_case_count': pg_result[0] if pg_result else 0,
                 'download_link': f'/api/stories/download/{story_id}',
                 'test_case_created_time': pg_result[1].isoformat() if pg_result and pg_result[1] else None,
                 'embedding_timestamp': embedding_timestamp,
-                'project_id': lance_story['project_id'].iloc[0] if 'project_id' in lance_story.columns else '',
+                'project_id': lance_story.get('project_id') or '',
                 'source': {
-                    'story': lance_story['source'].iloc[0] if 'source' in lance_story.columns else 'backend',
+                    'story': lance_story.get('source') or 'backend',
                     'test_cases': pg_result[2] if pg_result and len(pg_result) > 2 else 'backend'
                 }
             }
@@ -185,12 +202,27 @@ class DatabaseService:
             print(f"Error getting story {story_id}: {str(e)}")
             return None
         
-    def search_similar_stories(self, query: str, limit: int = 3) -> Dict[str, Any]:
+    def story_exists(self, story_id: str) -> bool:
+        """Whether a story with this ID is stored in LanceDB (index lookup, no row data read)"""
+        try:
+            stories_table = self.lance_db.open_table(self.TABLE_NAME_LANCE)
+            return story_exists(stories_table, story_id)
+        except Exception as e:
+            print(f"Error checking story {story_id}: {str(e)}")
+            return False
+        
+    def search_similar_stories(self, query: str, limit: int = 3, mode: str = 'story', nprobes: int = None, refine_factor: int = None,
+                               project_id: str = None, source: str = None) -> Dict[str, Any]:
         """
         Search for similar stories using vector similarity
         Args:
             query: Search query
             limit: Maximum number of results to return (default 3)
+            mode: 'story' searches one vector per story; 'chunk' searches per-chunk vectors
+                  and ranks each story by its best matching chunk (max-sim)
+            nprobes, refine_factor: ANN recall/latency knobs (see app/models/vector_index.py)
+            project_id, source: optional prefilters, so the top results all come from that
+                  project/source (chunk mode supports project_id only)
         Returns:
             Dictionary containing list of similar stories with similarity scores
         """
@@ -201,23 +233,28 @@ class DatabaseService:
             # Get stories table from LanceDB
             stories_table = self.lance_db.open_table(self.TABLE_NAME_LANCE)
             
-            # Get all data first to ensure we have complete story content
-            lance_data = stories_table.to_pandas()
-            
             # Encode the query using the embedding model
-            query_vector = Config.EMBEDDING_MODEL.encode(query).tolist()
+            query_vector = Config.ONLINE_EMBEDDER.encode(query).tolist()
 
             # Use LanceDB vector search
-            results = (
-                stories_table.search(query_vector)
-                .metric("cosine")
-                .limit(limit)
-                .to_list()
-            )
+            if mode == 'chunk':
+                results = search_chunks(query_vector, limit, open_chunk_table(self.lance_db), nprobes, refine_factor, project_id)
+            else:
+                results = (
+                    vector_search(stories_table, query_vector, nprobes, refine_factor, where=scope_filter(project_id, source))
+                    .limit(limit)
+                    .to_list()
+                )
 
             if not results:
                 return {'stories': [], 'message': 'No matching stories found'}
 
+            # Story columns for the matched IDs only
+            lance_data = read_stories_by_ids(
+                stories_table, [result['storyID'] for result in results],
+                ['doc_content_text', 'storyDescription', 'source']
+            )
+
             # Get PostgreSQL connection for fetching additional data
             with psycopg2.connect(**self.postgres_config) as conn:
                 with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
@@ -225,13 +262,13 @@ class DatabaseService:
                     for result in results:
                         story_id = result['storyID']
                         
-                        # Get complete story data from LanceDB DataFrame
-                        lance_story = lance_data[lance_data['storyID'] == story_id].iloc[0]
+                        # Get complete story data from LanceDB
+                        lance_story = lance_data.get(story_id, {})
                         
                         # Get story content from multiple possible sources
                         story_content = (
-                            lance_story.get('doc_content_text', '') or 
-                            lance_story.get('storyDescription', '')
+                            lance_story.get('doc_content_text') or 
+                            lance_story.get('storyDescription') or ''
                         )
                         
                         # Fetch test case data and impacted test cases count
@@ -276,8 +313,9 @@ class DatabaseService:
                                 'test_case_created_time': pg_result['created_on'].isoformat() if pg_result['created_on'] else None,
                                 'test_case_json': pg_result['test_case_json'],
                                 'similarity_score': result.get('_distance'),
+                                'matched_chunk': result.get('chunk_text'),
                                 'source': {
-                                    'story': lance_story.get('source', 'backend'),
+                                    'story': lance_story.get('source') or 'backend',
                                     'test_cases': pg_result['source'] or 'backend'
                                 }
                             }
@@ -292,15 +330,17 @@ class DatabaseService:
 def get_db_service() -> DatabaseService:
     """Get or create the singleton instance of DatabaseService"""
     if DatabaseService._instance is None:
-        DatabaseService(
-            postgres_config={
-                'dbname': Config.POSTGRES_DB,
-                'user': Config.POSTGRES_USER,
-                'password': Config.POSTGRES_PASSWORD,
-                'host': Config.POSTGRES_HOST,
-                'port': Config.POSTGRES_PORT
-            },
-            lance_db_path=Config.LANCE_DB_PATH
-        )
+        with DatabaseService._instance_lock:
+            if DatabaseService._instance is None:
+                DatabaseService(
+                    postgres_config={
+                        'dbname': Config.POSTGRES_DB,
+                        'user': Config.POSTGRES_USER,
+                        'password': Config.POSTGRES_PASSWORD,
+                        'host': Config.POSTGRES_HOST,
+                        'port': Config.POSTGRES_PORT
+                    },
+                    lance_db_path=Config.LANCE_DB_PATH
+                )
     return DatabaseService._instance
         
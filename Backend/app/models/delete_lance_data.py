@@ -8,7 +8,7 @@ sys.path.insert(0, backend_dir)
 
 import lancedb
 from app.config import Config
-from app.models.create_dbs import create_LanceDB
+from app.models.create_dbs import create_LanceDB, create_chunk_table
 
 def truncate_lance_db():
     """
@@ -26,9 +26,16 @@ def truncate_lance_db():
             print(f"✅ Successfully dropped table: {Config.TABLE_NAME_LANCE}")
         except Exception as e:
             print(f"⚠️ Table drop failed (might not exist): {e}")
+
+        try:
+            db.drop_table(Config.TABLE_NAME_LANCE_CHUNKS)
+            print(f"✅ Successfully dropped table: {Config.TABLE_NAME_LANCE_CHUNKS}")
+        except Exception as e:
+            print(f"⚠️ Table drop failed (might not exist): {e}")
         
         # Create new table with updated schema
         create_LanceDB()
+        create_chunk_table()
         print("✅ Successfully recreated table with updated schema")
         
     except Exception as e:
@@ -0,0 +1,66 @@
+import os
+import sys
+from datetime import timedelta
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import lancedb
+from app.config import Config
+from app.models.lance_utils import ensure_scalar_index
+from app.models.vector_index import ensure_vector_index
+
+# Compact once a table has this many fragments; old versions are kept for this many days
+COMPACTION_FRAGMENT_THRESHOLD = int(os.getenv("LANCE_COMPACTION_FRAGMENT_THRESHOLD", "32"))
+CLEANUP_OLDER_THAN_DAYS = int(os.getenv("LANCE_CLEANUP_OLDER_THAN_DAYS", "7"))
+
+def count_fragments(table) -> int:
+    return len(table.to_lance().get_fragments())
+
+def maintain_table(table, fragment_threshold: int = COMPACTION_FRAGMENT_THRESHOLD, force: bool = False) -> dict:
+    """
+    Merge small fragments, drop old versions and fold new rows into existing indices.
+    Skipped while the table has fewer than fragment_threshold fragments unless forced.
+    """
+    before = count_fragments(table)
+    if before < fragment_threshold and not force:
+        return {"fragments_before": before, "fragments_after": before, "compacted": False}
+
+    table.compact_files()
+    table.cleanup_old_versions(older_than=timedelta(days=CLEANUP_OLDER_THAN_DAYS))
+
+    dataset = table.to_lance()
+    if dataset.list_indices():
+        dataset.optimize.optimize_indices()
+
+    return {"fragments_before": before, "fragments_after": count_fragments(table), "compacted": True}
+
+def run_maintenance(force: bool = False) -> dict:
+    """Maintain the story and chunk tables; failures are reported, never raised"""
+    db = lancedb.connect(Config.LANCE_DB_PATH)
+    results = {}
+    for table_name in (Config.TABLE_NAME_LANCE, Config.TABLE_NAME_LANCE_CHUNKS):
+        try:
+            table = db.open_table(table_name)
+        except Exception:
+            continue
+        try:
+            if table_name == Config.TABLE_NAME_LANCE:
+                ensure_scalar_index(table, "storyID")
+            ensure_scalar_index(table, "project_id")
+            result = maintain_table(table, force=force)
+            result["vector_index"] = ensure_vector_index(table, table_name)
+            results[table_name] = result
+            if result["compacted"]:
+                print(f"🧹 [{table_name}] Compacted {result['fragments_before']} -> {result['fragments_after']} fragments")
+            else:
+                print(f"🧹 [{table_name}] {result['fragments_before']} fragments, compaction not needed")
+            print(f"🧭 [{table_name}] Vector index: {result['vector_index']}")
+        except Exception as e:
+            print(f"❌ Maintenance failed for {table_name}: {e}")
+    return results
+
+if __name__ == "__main__":
+    run_maintenance(force="--force" in sys.argv)
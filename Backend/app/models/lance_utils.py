@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, List, Optional
+
+import pyarrow as pa
+
+
+def sql_literal(value: str) -> str:
+    """Quote a string for use in a LanceDB filter expression"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def read_columns(table, columns: List[str], where: Optional[str] = None, limit: Optional[int] = None) -> pa.Table:
+    """Read only the given columns (optionally filtered) instead of materializing the whole table"""
+    return table.to_lance().to_table(columns=columns, filter=where, limit=limit)
+
+
+def has_scalar_index(table, column: str) -> bool:
+    return any(column in index.get("fields", []) for index in table.to_lance().list_indices())
+
+
+def ensure_scalar_index(table, column: str) -> bool:
+    """
+    Create a scalar (BTREE) index on `column` if the table has none yet, so equality filters
+    on it become index lookups. Rows added later are scanned until maintenance optimizes
+    the index. Returns whether an index exists; older LanceDB versions without scalar
+    indices keep using filtered scans.
+    """
+    try:
+        if has_scalar_index(table, column):
+            return True
+        if not hasattr(table, "create_scalar_index") or table.count_rows() == 0:
+            return False
+        table.create_scalar_index(column)
+        print(f"✅ Created scalar index on {column}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not create scalar index on {column}: {e}")
+        return False
+
+
+def scope_filter(project_id: Optional[str] = None, source: Optional[str] = None) -> Optional[str]:
+    """Filter restricting a search to one project and/or story source, or None for no filter"""
+    conditions = []
+    if project_id:
+        conditions.append(f"project_id = {sql_literal(project_id)}")
+    if source:
+        conditions.append(f"source = {sql_literal(source)}")
+    return " AND ".join(conditions) or None
+
+
+def get_story_row(table, story_id: str, columns: List[str]) -> Optional[Dict]:
+    """
+    Point lookup of one story by ID, reading only `columns`. Read-only: the storyID index
+    that turns it into an index lookup is created by lance_maintenance.run_maintenance.
+    """
+    rows = read_columns(table, columns, where=f"storyID = {sql_literal(story_id)}", limit=1).to_pylist()
+    return rows[0] if rows else None
+
+
+def story_exists(table, story_id: str) -> bool:
+    return get_story_row(table, story_id, ["storyID"]) is not None
+
+
+def in_filter(column: str, values: Iterable[str]) -> str:
+    """`column IN (...)` filter for a list of string values"""
+    return f"{column} IN ({', '.join(sql_literal(value) for value in values)})"
+
+
+def read_stories_by_ids(table, story_ids: Iterable[str], columns: List[str]) -> Dict[str, Dict]:
+    """Projected rows for the given story IDs only, keyed by storyID"""
+    story_ids = list(dict.fromkeys(story_ids))
+    if not story_ids:
+        return {}
+    if "storyID" not in columns:
+        columns = ["storyID", *columns]
+    rows = read_columns(table, columns, where=in_filter("storyID", story_ids)).to_pylist()
+    return {row["storyID"]: row for row in rows}
+
+
+class StoryIdIndex:
+    """In-memory set of story IDs, loaded once by projecting only the storyID column"""
+
+    def __init__(self, table):
+        self.table = table
+        self._ids = set(read_columns(table, ["storyID"]).column("storyID").to_pylist())
+
+    def __contains__(self, story_id) -> bool:
+        return story_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, story_ids: Iterable[str]):
+        """Record IDs written during this run"""
+        self._ids.update(story_ids)
@@ -0,0 +1,113 @@
+import os
+import atexit
+import threading
+from typing import Callable, Dict, List, Optional
+
+import lancedb
+from app.config import Config
+
+# A flush happens when this many rows are buffered or the oldest row has waited this long
+WRITER_MAX_ROWS = int(os.getenv("LANCE_WRITER_MAX_ROWS", "256"))
+WRITER_MAX_INTERVAL = float(os.getenv("LANCE_WRITER_MAX_INTERVAL", "10"))  # seconds
+
+FlushCallback = Callable[[bool, Optional[Exception]], None]
+
+
+class BufferedLanceWriter:
+    """
+    Buffers rows for one LanceDB table and writes them with a single add per flush,
+    so every story no longer creates its own small Lance fragment.
+    """
+
+    def __init__(self, table, max_rows: int = WRITER_MAX_ROWS, max_interval: float = WRITER_MAX_INTERVAL):
+        self.table = table
+        self.max_rows = max_rows
+        self.max_interval = max_interval
+        self._rows: List[Dict] = []
+        self._callbacks: List[FlushCallback] = []
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self.rows_written = 0
+        self.flushes = 0
+
+    def add(self, rows: List[Dict], on_flushed: Optional[FlushCallback] = None):
+        """
+        Buffer rows. on_flushed(success, error) runs once the flush containing them completes;
+        callbacks run while the writer lock is held, so they never overlap.
+        """
+        with self._lock:
+            self._rows.extend(rows)
+            if on_flushed is not None:
+                self._callbacks.append(on_flushed)
+
+            if len(self._rows) >= self.max_rows:
+                self.flush()
+            elif self._timer is None and self.max_interval > 0:
+                self._timer = threading.Timer(self.max_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> int:
+        """Write all buffered rows with one add; returns the number of rows written"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            rows, callbacks = self._rows, self._callbacks
+            self._rows, self._callbacks = [], []
+            if not rows:
+                for callback in callbacks:
+                    callback(True, None)
+                return 0
+
+            error = None
+            try:
+                self.table.add(rows)
+                self.rows_written += len(rows)
+                self.flushes += 1
+            except Exception as e:
+                error = e
+                print(f"❌ Error writing {len(rows)} buffered rows to LanceDB: {e}")
+
+            for callback in callbacks:
+                try:
+                    callback(error is None, error)
+                except Exception as e:
+                    print(f"❌ Flush callback failed: {e}")
+
+            if error is not None:
+                raise error
+            return len(rows)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+
+_writers: Dict[str, BufferedLanceWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(table_name: str, table=None) -> BufferedLanceWriter:
+    """
+    Process-wide buffered writer for a LanceDB table. `table` is only used the first time,
+    for callers that already opened (or created) the table.
+    """
+    with _writers_lock:
+        if table_name not in _writers:
+            if table is None:
+                table = lancedb.connect(Config.LANCE_DB_PATH).open_table(table_name)
+            _writers[table_name] = BufferedLanceWriter(table)
+        return _writers[table_name]
+
+
+def flush_all_writers():
+    for table_name, writer in list(_writers.items()):
+        try:
+            writer.flush()
+        except Exception as e:
+            print(f"❌ Final flush for {table_name} failed: {e}")
+
+
+atexit.register(flush_all_writers)
@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, List, Optional
+
+from app.models.lance_utils import read_columns
+
+
+class ProjectCatalog:
+    """
+    Story IDs per project (and from them, story counts), recomputed only when the LanceDB
+    table version changes (every add/update/delete creates a new version). Between writes
+    a request costs one version check.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._story_ids: Dict[Optional[str], List[str]] = {}
+
+    def _refresh(self, table):
+        version = table.version
+        if version != self._version:
+            self._story_ids = self._load_story_ids(table)
+            self._version = version
+
+    def counts(self, table) -> Dict[str, int]:
+        with self._lock:
+            self._refresh(table)
+            return {
+                project_id: len(story_ids)
+                for project_id, story_ids in self._story_ids.items()
+                if project_id and project_id.strip()
+            }
+
+    def projects(self, table) -> List[str]:
+        return list(self.counts(table))
+
+    def story_ids(self, table, project_id: Optional[str] = None) -> List[str]:
+        """Stored story IDs, optionally of one project only"""
+        with self._lock:
+            self._refresh(table)
+            if project_id:
+                return list(self._story_ids.get(project_id, []))
+            return [story_id for story_ids in self._story_ids.values() for story_id in story_ids]
+
+    @staticmethod
+    def _load_story_ids(table) -> Dict[Optional[str], List[str]]:
+        # Only the storyID and project_id columns are read
+        data = read_columns(table, ["storyID", "project_id"])
+        story_ids = {}
+        for story_id, project_id in zip(data.column("storyID").to_pylist(), data.column("project_id").to_pylist()):
+            story_ids.setdefault(project_id, []).append(story_id)
+        return story_ids
+
+
+project_catalog = ProjectCatalog()
@@ -0,0 +1,91 @@
+import os
+import json
+import math
+from datetime import datetime
+from typing import Optional
+
+from app.config import Config
+
+# Below this many rows a brute-force scan is fast and exact, so no index is built
+VECTOR_INDEX_MIN_ROWS = int(os.getenv("VECTOR_INDEX_MIN_ROWS", "10000"))
+# Rebuild once the table has grown by this fraction since the last build
+VECTOR_INDEX_REBUILD_GROWTH = float(os.getenv("VECTOR_INDEX_REBUILD_GROWTH", "0.2"))
+# Defaults for queries against an IVF-PQ index; both can be overridden per request
+VECTOR_SEARCH_NPROBES = int(os.getenv("VECTOR_SEARCH_NPROBES", "20"))
+VECTOR_SEARCH_REFINE_FACTOR = int(os.getenv("VECTOR_SEARCH_REFINE_FACTOR", "10")) or None
+# 768-d mpnet vectors split into 96 sub-vectors of 8 dimensions for PQ
+VECTOR_INDEX_SUB_VECTORS = int(os.getenv("VECTOR_INDEX_SUB_VECTORS", "96"))
+
+def _state_path(table_name: str) -> str:
+    return os.path.join(Config.LANCE_DB_PATH, f"{table_name}.vector_index.json")
+
+def _load_state(table_name: str) -> dict:
+    try:
+        with open(_state_path(table_name)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_state(table_name: str, state: dict):
+    with open(_state_path(table_name), "w") as f:
+        json.dump(state, f)
+
+def has_vector_index(table, column: str = "vector") -> bool:
+    # pylance reports IVF-PQ indices as type "Vector" (newer releases name the IVF variant);
+    # anything on the vector column that is not a scalar index counts
+    return any(
+        column in index.get("fields", []) and str(index.get("type", "")).lower() not in ("scalar", "btree", "bitmap")
+        for index in table.to_lance().list_indices()
+    )
+
+def ensure_vector_index(table, table_name: str, force: bool = False) -> str:
+    """
+    Build an IVF-PQ cosine index on `vector` once the table has VECTOR_INDEX_MIN_ROWS rows,
+    and rebuild it after VECTOR_INDEX_REBUILD_GROWTH growth (new rows are otherwise searched
+    by brute force next to the index). Returns "skipped", "current" or "built".
+    """
+    rows = table.count_rows()
+    if rows < VECTOR_INDEX_MIN_ROWS and not force:
+        return "skipped"
+
+    state = _load_state(table_name)
+    indexed_rows = state.get("rows", 0)
+    # The saved row count decides; the index listing only catches a table recreated without one
+    if not force and indexed_rows and rows < indexed_rows * (1 + VECTOR_INDEX_REBUILD_GROWTH) and has_vector_index(table):
+        return "current"
+
+    # ~sqrt(n) partitions, each still holding enough rows to train its centroid
+    num_partitions = max(1, min(int(math.sqrt(rows)), rows // 256 or 1))
+    print(f"🧭 [{table_name}] Building IVF-PQ index over {rows} rows ({num_partitions} partitions)...")
+    table.create_index(
+        metric="cosine",
+        num_partitions=num_partitions,
+        num_sub_vectors=VECTOR_INDEX_SUB_VECTORS,
+        vector_column_name="vector",
+        replace=True
+    )
+    _save_state(table_name, {
+        "rows": rows,
+        "num_partitions": num_partitions,
+        "built_at": datetime.now().isoformat()
+    })
+    return "built"
+
+def vector_search(table, query_vector, nprobes: Optional[int] = None, refine_factor: Optional[int] = None,
+                  where: Optional[str] = None):
+    """
+    Cosine search builder with the ANN knobs applied; callers add .limit() and run it.
+    nprobes (IVF partitions scanned) and refine_factor (candidates re-ranked with exact
+    distances) only matter once an index exists; a table without one is searched exactly.
+    `where` is applied as a prefilter, so the top-k is taken from matching rows only
+    (see lance_utils.scope_filter); the project_id index built by maintenance keeps it cheap.
+    """
+    nprobes = nprobes or VECTOR_SEARCH_NPROBES
+    refine_factor = refine_factor or VECTOR_SEARCH_REFINE_FACTOR
+
+    query = table.search(query_vector).metric("cosine").nprobes(nprobes)
+    if refine_factor:
+        query = query.refine_factor(refine_factor)
+    if where:
+        query = query.where(where, prefilter=True)
+    return query
@@ -13,6 +13,8 @@ from dateutil import parser
 # Local application imports
 from app.config import Config
 from app.models.db_service import get_db_service
+from app.models.lance_utils import read_stories_by_ids
+from app.models.project_catalog import project_catalog
 from app.LLM.impact_analyzer import analyze_test_case_impacts
 from app.utils.excel_util import generate_excel
 from app.LLM.Test_case_generator import Chat_RAG
@@ -76,19 +78,19 @@ def get_stories():
         params.extend([per_page, (page - 1) * per_page])
 
         
-        # Get embedding timestamps and doc_content_text from LanceDB
-        db = lancedb.connect(Config.LANCE_DB_PATH)
-        table = db.open_table(Config.TABLE_NAME_LANCE)
-        lance_data = table.to_pandas()
-        embedding_timestamps = dict(zip(lance_data['storyID'], lance_data['embedding_timestamp']))
-        doc_content_texts = dict(zip(lance_data['storyID'], lance_data['doc_content_text']))
-        
         # Execute query
         with Config.get_postgres_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
                 cursor.execute(query, params)
                 stories = cursor.fetchall()
                 
+                # Get embedding timestamps and doc_content_text from LanceDB for this page only
+                db = lancedb.connect(Config.LANCE_DB_PATH)
+                table = db.open_table(Config.TABLE_NAME_LANCE)
+                lance_rows = read_stories_by_ids(
+                    table, [story['id'] for story in stories], ['embedding_timestamp', 'doc_content_text']
+                )
+                
                 # Get total count for pagination
                 count_query = """
                     SELECT COUNT(*) 
@@ -131,7 +133,8 @@ def get_stories():
                     story_dict['source'] = source
 
                     # Add embedding timestamp from LanceDB
-                    story_dict['embedding_timestamp'] = embedding_timestamps.get(story_dict['id'])
+                    lance_row = lance_rows.get(story_dict['id'], {})
+                    story_dict['embedding_timestamp'] = lance_row.get('embedding_timestamp')
                     if story_dict['embedding_timestamp'] and hasattr(story_dict['embedding_timestamp'], 'isoformat'):
                         story_dict['embedding_timestamp'] = story_dict['embedding_timestamp'].isoformat()
 
@@ -140,7 +143,7 @@ def get_stories():
                         story_dict['test_case_created_time'] = story_dict['test_case_created_time'].isoformat()
 
                     # Get document content from LanceDB's doc_content_text
-                    story_dict['doc_content_text'] = doc_content_texts.get(story_dict['id'])
+                    story_dict['doc_content_text'] = lance_row.get('doc_content_text')
 
                     # Ensure impactedTestCases is included with the correct case
                     if 'impactedtestcases' in story_dict:
@@ -184,15 +187,34 @@ def search_stories():
             
         query = data['query']
         limit = data.get('limit', 5)
+        mode = data.get('mode', 'story')
+        # Optional ANN tuning: more probes / refinement trade latency for recall
+        nprobes = data.get('nprobes')
+        refine_factor = data.get('refine_factor')
+        # Optional prefilters applied inside the vector search
+        project_id = data.get('project_id')
+        source = data.get('source')
         
         if not query.strip():
             return jsonify({'error': 'Query cannot be empty'}), 400
             
         if limit < 1:
             limit = 5
+
+        if mode not in ['story', 'chunk']:
+            return jsonify({'error': 'Invalid mode. Must be "story" or "chunk"'}), 400
+
+        if mode == 'chunk' and source:
+            return jsonify({'error': 'source filter is only supported in "story" mode'}), 400
+
+        for name, value in (('nprobes', nprobes), ('refine_factor', refine_factor)):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                return jsonify({'error': f'{name} must be a positive integer'}), 400
             
         db_service = get_db_service()
-        results = db_service.search_similar_stories(query, limit)
+        results = db_service.search_similar_stories(
+            query, limit, mode=mode, nprobes=nprobes, refine_factor=refine_factor, project_id=project_id, source=source
+        )
         return jsonify(results)
     except Exception as e:
         print(f"Error searching stories: {str(e)}")
@@ -369,8 +391,16 @@ def rag_chat():
         if not data or 'query' not in data:
             return jsonify({'error': 'Query is required'}), 400
         user_query = data['query']
+        nprobes = data.get('nprobes')
+        refine_factor = data.get('refine_factor')
+        for name, value in (('nprobes', nprobes), ('refine_factor', refine_factor)):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+                return jsonify({'error': f'{name} must be a positive integer'}), 400
         # 1. Retrieve similar stories and their test cases
-        rag_results = Chat_RAG(user_query, top_k=3)
+        rag_results = Chat_RAG(
+            user_query, top_k=3, nprobes=nprobes, refine_factor=refine_factor,
+            project_id=data.get('project_id'), source=data.get('source')
+        )
         context_cases = []
         for res in rag_results:
             tc_json = res.get('test_case_json')
@@ -392,7 +422,9 @@ Now, based on the following user story, generate new, comprehensive test cases i
 """
 
         # 3. Call Gemini LLM using the configured object
-        response = Config.llm.invoke(prompt)
+        from app.LLM import llm_calls
+        # "use_cache": false asks Gemini again even if this exact prompt was answered before
+        response = llm_calls.invoke(prompt, Config.llm, use_cache=data.get('use_cache', True) is not False)
         text = response.content.strip()
         print("LLM raw output:", repr(text))
         # Clean triple backticks and ```json
@@ -422,22 +454,45 @@ Now, based on the following user story, generate new, comprehensive test cases i
         print(f"Error in rag_chat: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@stories_bp.route('/llm-metrics', methods=['GET'])
+def get_llm_metrics():
+    """Budget levels and queue-wait metrics of the shared LLM rate limiter, plus response cache hits"""
+    try:
+        from app.LLM.rate_limiter import llm_rate_limiter
+        from app.LLM.response_cache import get_response_cache
+        metrics = llm_rate_limiter.stats()
+        cache = get_response_cache()
+        metrics['response_cache'] = cache.stats() if cache is not None else {'enabled': False}
+        return jsonify(metrics)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@stories_bp.route('/embedding-metrics', methods=['GET'])
+def get_embedding_metrics():
+    """Queue-time and batch-size metrics of the online embedding micro-batcher"""
+    try:
+        embedder = Config.ONLINE_EMBEDDER
+        if not embedder.loaded:
+            return jsonify({'loaded': False})
+        if not hasattr(embedder.get(), 'stats'):
+            return jsonify({'loaded': True, 'micro_batching': False})
+        return jsonify({'loaded': True, 'micro_batching': True, **embedder.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @stories_bp.route('/projects', methods=['GET'])
 def get_projects():
-    """Get unique project IDs"""
+    """Get unique project IDs and the number of stories in each"""
     try:
         db_service = get_db_service()
         
-        # Get stories from LanceDB
+        # Cached catalog, refreshed only when the LanceDB table has changed
         stories_table = db_service.lance_db.open_table(Config.TABLE_NAME_LANCE)
-        lance_stories = stories_table.to_pandas()
-        
-        # Get unique project IDs
-        project_ids = lance_stories['project_id'].dropna().unique().tolist()
-        project_ids = [pid for pid in project_ids if pid and pid.strip()]
+        counts = project_catalog.counts(stories_table)
         
         return jsonify({
-            'projects': project_ids
+            'projects': list(counts),
+            'counts': counts
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -461,16 +516,16 @@ def upload_story():
 
         # Check if story already exists
         db_service = get_db_service()
-        existing_story = db_service.get_story(story_id)
-        if existing_story:
+        if db_service.story_exists(story_id):
             return jsonify({
                 'error': f'Story with ID "{story_id}" already exists'
             }), 409
 
-        # Create project folder if it doesn't exist
+        # Files uploaded here are ingested by this request, so they are staged outside
+        # UPLOAD_FOLDER where the scheduler's rescan and folder watcher would ingest them again
         import os
-        upload_dir = os.getenv("UPLOAD_FOLDER", "./data/uploaded_docs")
-        project_dir = os.path.join(upload_dir, project_id)
+        staging_dir = os.getenv("UPLOAD_STAGING_FOLDER", "./data/upload_staging")
+        project_dir = os.path.join(staging_dir, project_id)
         os.makedirs(project_dir, exist_ok=True)
 
         # Handle file upload if provided
@@ -486,7 +541,7 @@ def upload_story():
                     'error': f'File type {file_ext} not supported. Allowed: {", ".join(allowed_extensions)}'
                 }), 400
 
-            # Save file to project folder
+            # Save file to the project's staging folder
             filename = f"{story_id}{file_ext}"
             file_path = os.path.join(project_dir, filename)
             file.save(file_path)
@@ -509,24 +564,7 @@ def upload_story():
 
         # Generate AI description from content using chunking method
         try:
-            def summarize_in_chunks(text, chunk_size=4000):
-                try:
-                    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
-                    summaries = []
-                    for chunk in chunks[:3]:  # Limit to 3 chunks for efficiency
-                        prompt = (
-                            "Summarize the following document section in 1 sentence:\n\n" + chunk
-                        )
-                        try:
-                            response = Config.llm.invoke(prompt)
-                            summaries.append(response.content.strip())
-                        except Exception as e:
-                            summaries.append("[Summary failed for a chunk]")
-                            print(f"❌ LLM failed on a chunk: {e}")
-                    return " ".join(summaries)
-                except Exception as e:
-                    print(f"❌ LLM summary failed: {e}")
-                    return "Summary could not be generated."
+            from app.LLM.summarizer import summarize_in_chunks
 
             # Generate description using the chunking method
             description = summarize_in_chunks(story_content)
@@ -538,18 +576,18 @@ def upload_story():
 
         # Add to LanceDB
         try:
-            from app.config import EMBEDDING_MODEL
             from datetime import datetime
-            import lancedb
+            from app.models.lance_writer import get_writer
             
-            db = lancedb.connect(Config.LANCE_DB_PATH)
-            table = db.open_table(Config.TABLE_NAME_LANCE)
+            writer = get_writer(Config.TABLE_NAME_LANCE)
             
             # Generate embedding
-            embedding = EMBEDDING_MODEL.encode(story_content).tolist()
+            from app.datapipeline.chunk_index import index_story_chunks, truncate_for_embedding
+            from app.models.content_cache import encode_cached
+            embedding = encode_cached(truncate_for_embedding(story_content), Config.ONLINE_EMBEDDER).tolist()
             
-            # Add to LanceDB
-            table.add([{
+            # Add to LanceDB through the shared writer; flush now because test generation reads the row next
+            writer.add([{
                 "project_id": project_id,
                 "vector": embedding,
                 "storyID": story_id,
@@ -561,6 +599,12 @@ def upload_story():
                 "embedding_timestamp": datetime.now(),
                 "source": source  # Add source field
             }])
+            writer.flush()
+
+            try:
+                index_story_chunks([{"storyID": story_id, "project_id": project_id, "text": story_content}])
+            except Exception as e:
+                print(f"⚠️ Chunk indexing failed for {story_id}: {e}")
             
         except Exception as e:
             return jsonify({
@@ -0,0 +1,39 @@
+import os
+import sys
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import lancedb
+from app.config import Config
+from app.datapipeline.chunk_index import open_chunk_table, index_story_chunks
+
+BATCH_SIZE = 32
+
+def main():
+    """Add chunk vectors for stories ingested before the chunk index existed"""
+    db = lancedb.connect(Config.LANCE_DB_PATH)
+    stories_table = db.open_table(Config.TABLE_NAME_LANCE)
+    chunk_table = open_chunk_table(db)
+
+    indexed_ids = set(chunk_table.to_lance().to_table(columns=["storyID"]).column("storyID").to_pylist())
+    stories = stories_table.to_lance().to_table(columns=["storyID", "project_id", "doc_content_text"]).to_pylist()
+    missing = [story for story in stories if story["storyID"] not in indexed_ids and story.get("doc_content_text")]
+
+    print(f"📊 {len(stories)} stories in LanceDB, {len(indexed_ids)} already chunk-indexed, {len(missing)} to backfill")
+
+    total_chunks = 0
+    for i in range(0, len(missing), BATCH_SIZE):
+        batch = [
+            {"storyID": story["storyID"], "project_id": story["project_id"] or "", "text": story["doc_content_text"]}
+            for story in missing[i:i + BATCH_SIZE]
+        ]
+        total_chunks += index_story_chunks(batch, chunk_table)
+        print(f"🧩 [{min(i + BATCH_SIZE, len(missing))}/{len(missing)}] stories backfilled")
+
+    print(f"✅ Backfill complete: {total_chunks} chunks written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import numpy as np
+import lancedb
+from app.config import Config
+from app.datapipeline.embedding_backends import BACKENDS, BACKEND_TORCH, load_embedding_model
+
+def load_stored_stories(sample_size):
+    """Load story texts from LanceDB, reading only the columns we need"""
+    db = lancedb.connect(Config.LANCE_DB_PATH)
+    table = db.open_table(Config.TABLE_NAME_LANCE)
+    stories = table.to_lance().to_table(columns=["storyID", "doc_content_text"]).to_pandas()
+    stories = stories[stories["doc_content_text"].fillna("").str.strip() != ""]
+    return stories.head(sample_size)
+
+def time_encode(model, texts, batch_size):
+    """Encode texts once to warm up, then time a full pass"""
+    model.encode(texts[:batch_size], batch_size=batch_size)
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return np.asarray(vectors, dtype=np.float32), elapsed
+
+def normalize(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def top_k_neighbours(vectors, k):
+    """Top-k cosine neighbours of every story among the others (self excluded)"""
+    unit = normalize(vectors)
+    similarity = unit @ unit.T
+    np.fill_diagonal(similarity, -np.inf)
+    return np.argsort(-similarity, axis=1)[:, :k]
+
+def recall_at_k(reference_neighbours, candidate_neighbours):
+    hits = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference_neighbours, candidate_neighbours)]
+    return float(np.mean(hits))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends against the fp32 reference model")
+    parser.add_argument("--backends", nargs="+", default=[b for b in BACKENDS if b != BACKEND_TORCH], choices=BACKENDS)
+    parser.add_argument("--sample-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    stories = load_stored_stories(args.sample_size)
+    texts = stories["doc_content_text"].tolist()
+    if len(texts) <= args.k:
+        print(f"❌ Need more than {args.k} stored stories to measure recall@{args.k}, found {len(texts)}")
+        return
+
+    print(f"📊 Benchmarking on {len(texts)} stored stories (model: {Config.EMBEDDING_MODEL_NAME})")
+
+    reference_model = load_embedding_model(Config.EMBEDDING_MODEL_NAME, BACKEND_TORCH)
+    reference_vectors, reference_time = time_encode(reference_model, texts, args.batch_size)
+    reference_neighbours = top_k_neighbours(reference_vectors, args.k)
+    print(f"\n🔢 {BACKEND_TORCH} (fp32 reference): {len(texts) / reference_time:.1f} texts/s, dim {reference_vectors.shape[1]}")
+
+    for backend in args.backends:
+        try:
+            model = load_embedding_model(Config.EMBEDDING_MODEL_NAME, backend)
+        except ImportError as e:
+            print(f"\n⚠️ Skipping {backend}: missing dependency ({e})")
+            continue
+
+        vectors, elapsed = time_encode(model, texts, args.batch_size)
+        if vectors.shape[1] != reference_vectors.shape[1]:
+            print(f"\n❌ {backend}: dimension {vectors.shape[1]} does not match the LanceDB schema ({reference_vectors.shape[1]})")
+            continue
+
+        cosine = np.sum(normalize(vectors) * normalize(reference_vectors), axis=1)
+        recall = recall_at_k(reference_neighbours, top_k_neighbours(vectors, args.k))
+
+        print(f"\n🔢 {backend}:")
+        print(f"   Throughput: {len(texts) / elapsed:.1f} texts/s ({reference_time / elapsed:.2f}x vs fp32)")
+        print(f"   Cosine to fp32 vectors: mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+        print(f"   Recall@{args.k} vs fp32 neighbours: {recall:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+from app.models.lance_utils import read_columns, sql_literal, ensure_scalar_index
+from app.models.db_service import STORY_DETAIL_COLUMNS
+
+VECTOR_DIM = 768
+WRITE_BATCH = 10000
+
+def synthetic_batch(start, count, rng):
+    """Rows shaped like user_stories: 768-d vector plus a few KB of text per story"""
+    story_ids = [f"STORY-{i:07d}" for i in range(start, start + count)]
+    vectors = rng.random((count, VECTOR_DIM), dtype=np.float32)
+    return pa.table({
+        "project_id": [f"PROJECT-{i % 20}" for i in range(start, start + count)],
+        "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), VECTOR_DIM),
+        "storyID": story_ids,
+        "storyDescription": [f"Summary of {story_id}" for story_id in story_ids],
+        "test_case_content": [""] * count,
+        "filename": [f"{story_id}.txt" for story_id in story_ids],
+        "original_path": [None] * count,
+        "doc_content_text": [f"As a user of {story_id} I want ... " * 60 for story_id in story_ids],
+        "embedding_timestamp": pa.array([datetime.now()] * count, pa.timestamp("us")),
+        "source": ["backend"] * count
+    })
+
+def build_table(db, size, rng):
+    table = None
+    for start in range(0, size, WRITE_BATCH):
+        batch = synthetic_batch(start, min(WRITE_BATCH, size - start), rng)
+        if table is None:
+            table = db.create_table(f"stories_{size}", data=batch)
+        else:
+            table.add(batch)
+    table.compact_files()
+    return table
+
+def time_lookups(lookup, story_ids):
+    timings = []
+    for story_id in story_ids:
+        start = time.perf_counter()
+        found = lookup(story_id)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert found, f"{story_id} not found"
+    return np.median(timings), np.percentile(timings, 95)
+
+def full_scan_lookup(table):
+    # What get_story did before: materialize the table in pandas and filter
+    def lookup(story_id):
+        data = table.to_pandas()
+        return not data[data["storyID"] == story_id].empty
+    return lookup
+
+def filtered_lookup(table):
+    def lookup(story_id):
+        where = f"storyID = {sql_literal(story_id)}"
+        return read_columns(table, STORY_DETAIL_COLUMNS, where=where, limit=1).num_rows > 0
+    return lookup
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark get_story lookups: full scan vs filtered projection vs scalar index")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--full-scan-max", type=int, default=10000,
+                        help="Skip the to_pandas() baseline above this many stories (it reads every vector)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    work_dir = tempfile.mkdtemp(prefix="story_lookup_bench_")
+    db = lancedb.connect(work_dir)
+
+    print(f"{'stories':>8} | {'method':<22} | {'median ms':>9} | {'p95 ms':>8}")
+    print("-" * 56)
+    try:
+        for size in args.sizes:
+            table = build_table(db, size, rng)
+            story_ids = [f"STORY-{random.randrange(size):07d}" for _ in range(args.lookups)]
+
+            methods = []
+            if size <= args.full_scan_max:
+                methods.append(("to_pandas + filter", full_scan_lookup(table)))
+            methods.append(("filter + projection", filtered_lookup(table)))
+
+            for name, lookup in methods:
+                median, p95 = time_lookups(lookup, story_ids)
+                print(f"{size:>8} | {name:<22} | {median:>9.2f} | {p95:>8.2f}")
+
+            if ensure_scalar_index(table, "storyID"):
+                median, p95 = time_lookups(filtered_lookup(table), story_ids)
+                print(f"{size:>8} | {'scalar index on storyID':<22} | {median:>9.2f} | {p95:>8.2f}")
+            else:
+                print(f"{size:>8} | {'scalar index on storyID':<22} | {'n/a (LanceDB too old)':>20}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
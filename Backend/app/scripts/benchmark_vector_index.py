@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.abspath(os.path.join(current_dir, "../.."))
+sys.path.insert(0, backend_dir)
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+from app.config import Config
+from app.models.vector_index import VECTOR_INDEX_SUB_VECTORS
+
+VECTOR_DIM = 768
+
+def load_vectors(source, synthetic_size, rng):
+    """Stored story (or chunk) vectors, or clustered random vectors when --synthetic is given"""
+    if synthetic_size:
+        centers = rng.normal(size=(max(1, synthetic_size // 500), VECTOR_DIM))
+        labels = rng.integers(0, len(centers), synthetic_size)
+        return (centers[labels] + 0.3 * rng.normal(size=(synthetic_size, VECTOR_DIM))).astype(np.float32)
+
+    table_name = Config.TABLE_NAME_LANCE_CHUNKS if source == "chunks" else Config.TABLE_NAME_LANCE
+    table = lancedb.connect(Config.LANCE_DB_PATH).open_table(table_name)
+    vectors = table.to_lance().to_table(columns=["vector"]).column("vector").to_pylist()
+    return np.asarray(vectors, dtype=np.float32)
+
+def exact_top_k(vectors, queries, k):
+    """Ground truth: brute-force cosine neighbours computed in numpy"""
+    unit = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    unit_queries = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+    return np.argsort(-(unit_queries @ unit.T), axis=1)[:, :k]
+
+def run_queries(table, queries, k, nprobes=None, refine_factor=None):
+    found, timings = [], []
+    for query in queries:
+        search = table.search(query.tolist()).metric("cosine").limit(k)
+        if nprobes:
+            search = search.nprobes(nprobes)
+        if refine_factor:
+            search = search.refine_factor(refine_factor)
+        start = time.perf_counter()
+        hits = search.to_list()
+        timings.append((time.perf_counter() - start) * 1000)
+        found.append([hit["row_id"] for hit in hits])
+    return found, np.median(timings), np.percentile(timings, 95)
+
+def recall(truth, found):
+    return float(np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the IVF-PQ index against exact cosine search")
+    parser.add_argument("--source", choices=["stories", "chunks"], default="stories")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use this many synthetic vectors instead of stored ones")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobes", nargs="+", type=int, default=[5, 10, 20, 50])
+    parser.add_argument("--refine-factors", nargs="+", type=int, default=[0, 5, 10])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = load_vectors(args.source, args.synthetic, rng)
+    if len(vectors) < 256:
+        print(f"❌ Need at least 256 vectors to train an IVF-PQ index, found {len(vectors)}")
+        return
+
+    query_ids = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[query_ids] + 0.05 * rng.normal(size=(len(query_ids), VECTOR_DIM)).astype(np.float32)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    work_dir = tempfile.mkdtemp(prefix="vector_index_bench_")
+    try:
+        db = lancedb.connect(work_dir)
+        table = db.create_table("vectors", data=pa.table({
+            "row_id": np.arange(len(vectors)),
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), VECTOR_DIM)
+        }))
+
+        print(f"📊 {len(vectors)} vectors, {len(queries)} queries, recall@{args.k} against exact search")
+        print(f"{'method':<28} | {'recall':>6} | {'median ms':>9} | {'p95 ms':>8}")
+        print("-" * 62)
+
+        found, median, p95 = run_queries(table, queries, args.k)
+        print(f"{'exact (no index)':<28} | {recall(truth, found):>6.3f} | {median:>9.2f} | {p95:>8.2f}")
+
+        num_partitions = max(1, min(int(np.sqrt(len(vectors))), len(vectors) // 256))
+        start = time.perf_counter()
+        table.create_index(metric="cosine", num_partitions=num_partitions,
+                           num_sub_vectors=VECTOR_INDEX_SUB_VECTORS, vector_column_name="vector")
+        print(f"🧭 Index built in {time.perf_counter() - start:.1f}s ({num_partitions} partitions)")
+
+        for nprobes in args.nprobes:
+            for refine_factor in args.refine_factors:
+                found, median, p95 = run_queries(table, queries, args.k, nprobes, refine_factor)
+                label = f"nprobes={nprobes} refine={refine_factor or '-'}"
+                print(f"{label:<28} | {recall(truth, found):>6.3f} | {median:>9.2f} | {p95:>8.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingEncode:
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchEncoder:
+    """
+    Gathers concurrent encode calls for a few milliseconds and runs them as one batched forward pass.
+    Exposes the same encode() shape as SentenceTransformer so request handlers can use it directly.
+    """
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 5.0, metrics_window: int = 1000):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._queue_times_ms = deque(maxlen=metrics_window)
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._encode_times_ms = deque(maxlen=metrics_window)
+        self.total_requests = 0
+        self.total_batches = 0
+        self.failed_batches = 0
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        """Encode a string or list of strings; options other than the defaults bypass the queue"""
+        if kwargs:
+            return self.model.encode(sentences, **kwargs)
+
+        single = isinstance(sentences, str)
+        pending = [self._submit(text) for text in ([sentences] if single else sentences)]
+        if single:
+            return pending[0].future.result()
+        if not pending:
+            return self.model.encode([])
+        return np.vstack([item.future.result() for item in pending])
+
+    def _submit(self, text: str) -> _PendingEncode:
+        self._ensure_worker()
+        item = _PendingEncode(text)
+        self._queue.put(item)
+        return item
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-micro-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingEncode]):
+        started = time.perf_counter()
+        try:
+            vectors = self.model.encode([item.text for item in batch], batch_size=len(batch))
+            for item, vector in zip(batch, vectors):
+                item.future.set_result(vector)
+            failed = False
+        except Exception as e:
+            logger.error(f"❌ Batched encode of {len(batch)} texts failed: {e}")
+            for item in batch:
+                item.future.set_exception(e)
+            failed = True
+        finished = time.perf_counter()
+
+        with self._metrics_lock:
+            self.total_requests += len(batch)
+            self.total_batches += 1
+            if failed:
+                self.failed_batches += 1
+            self._batch_sizes.append(len(batch))
+            self._encode_times_ms.append((finished - started) * 1000)
+            self._queue_times_ms.extend((started - item.enqueued_at) * 1000 for item in batch)
+
+    @staticmethod
+    def _percentile(values, pct: float) -> float:
+        return round(float(np.percentile(values, pct)), 3) if values else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue-time and batch-size metrics over the most recent batches"""
+        with self._metrics_lock:
+            queue_times = list(self._queue_times_ms)
+            batch_sizes = list(self._batch_sizes)
+            encode_times = list(self._encode_times_ms)
+            return {
+                "total_requests": self.total_requests,
+                "total_batches": self.total_batches,
+                "failed_batches": self.failed_batches,
+                "pending": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "batch_size": {
+                    "mean": round(float(np.mean(batch_sizes)), 2) if batch_sizes else 0.0,
+                    "max": max(batch_sizes) if batch_sizes else 0
+                },
+                "queue_time_ms": {
+                    "p50": self._percentile(queue_times, 50),
+                    "p95": self._percentile(queue_times, 95),
+                    "max": round(max(queue_times), 3) if queue_times else 0.0
+                },
+                "encode_time_ms": {
+                    "p50": self._percentile(encode_times, 50),
+                    "p95": self._percentile(encode_times, 95)
+                }
+            }
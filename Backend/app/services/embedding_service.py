@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5002
+MAX_SENTENCES_PER_REQUEST = 64
+
+
+class EmbeddingService:
+    """Owns the single in-memory embedding model and serializes access to its CPU threads"""
+
+    def __init__(self, model=None, num_threads: Optional[int] = None):
+        if num_threads:
+            import torch
+            torch.set_num_threads(num_threads)
+
+        if model is None:
+            from app.config import build_local_embedding_model
+            model = build_local_embedding_model()
+
+        self.model = model
+        self.dimension = model.get_sentence_embedding_dimension()
+        self._lock = threading.Lock()
+        self.requests_served = 0
+        self.sentences_encoded = 0
+
+    def encode(self, sentences: List[str], batch_size: int = 32, normalize_embeddings: bool = False) -> np.ndarray:
+        with self._lock:
+            vectors = self.model.encode(
+                sentences,
+                batch_size=batch_size,
+                normalize_embeddings=normalize_embeddings,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+            self.requests_served += 1
+            self.sentences_encoded += len(sentences)
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "dimension": self.dimension,
+            "requests_served": self.requests_served,
+            "sentences_encoded": self.sentences_encoded
+        }
+
+
+class _EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    server_version = "EmbeddingService/1.0"
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/encode":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send_json(400, {"error": "Invalid JSON body"})
+            return
+
+        sentences = data.get("sentences")
+        if not isinstance(sentences, list) or not all(isinstance(s, str) for s in sentences):
+            self._send_json(400, {"error": "'sentences' must be a list of strings"})
+            return
+
+        try:
+            start = time.perf_counter()
+            vectors = self.server.service.encode(
+                sentences,
+                batch_size=int(data.get("batch_size", 32)),
+                normalize_embeddings=bool(data.get("normalize_embeddings", False))
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._send_json(200, {
+                "embeddings": np.asarray(vectors, dtype=np.float32).tolist(),
+                "elapsed_ms": round(elapsed_ms, 2)
+            })
+        except Exception as e:
+            logger.error(f"❌ Embedding request failed: {e}")
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, num_threads: Optional[int] = None):
+    """Run the embedding worker until interrupted"""
+    service = EmbeddingService(num_threads=num_threads)
+    httpd = ThreadingHTTPServer((host, port), _EmbeddingRequestHandler)
+    httpd.service = service
+    print(f"✅ Embedding service listening on http://{host}:{port} (dimension {service.dimension})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Embedding service stopped by user.")
+    finally:
+        httpd.server_close()
+
+
+class EmbeddingServiceClient:
+    """Drop-in replacement for SentenceTransformer.encode backed by the shared embedding service"""
+
+    def __init__(self, base_url: str, timeout: float = 60.0, max_sentences_per_request: int = MAX_SENTENCES_PER_REQUEST):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_sentences_per_request = max_sentences_per_request
+        self.session = requests.Session()
+        self._dimension = None
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Encode a string or a list of strings, mirroring SentenceTransformer.encode's return shape"""
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        if not sentences:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        batches = []
+        for i in range(0, len(sentences), self.max_sentences_per_request):
+            response = self.session.post(
+                f"{self.base_url}/encode",
+                json={
+                    "sentences": sentences[i:i + self.max_sentences_per_request],
+                    "batch_size": batch_size,
+                    "normalize_embeddings": normalize_embeddings
+                },
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            batches.append(np.asarray(response.json()["embeddings"], dtype=np.float32))
+
+        vectors = np.vstack(batches)
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
+            response.raise_for_status()
+            self._dimension = response.json()["dimension"]
+        return self._dimension
+
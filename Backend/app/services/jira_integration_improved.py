@@ -19,6 +19,11 @@ import requests
 import pandas as pd
 import lancedb
 from app.config import Config
+from app.models.lance_utils import read_columns
+from app.datapipeline.chunk_index import index_story_chunks, truncate_for_embedding
+from app.models.lance_writer import get_writer
+from app.models.content_cache import encode_cached
+from app.LLM.summarizer import summarize_jira_story, PENDING_SUMMARY, TWO_PHASE_INGESTION
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -336,6 +341,8 @@ class JiraIntegration:
         except Exception as e:
             logger.error(f"❌ Error opening LanceDB table: {e}")
             raise
+        # Issues are written one page at a time instead of one fragment per issue
+        self.writer = get_writer(Config.TABLE_NAME_LANCE, self.table)
     
     async def sync_stories(self, statuses: List[JiraStatus] = None, issue_types: List[JiraIssueType] = None, project_keys: List[str] = None) -> Dict[str, int]:
         """Sync stories from Jira to LanceDB"""
@@ -370,10 +377,21 @@ class JiraIntegration:
             
             logger.info(f"🔍 Processing {len(issues)} issues (start_at: {start_at})")
             
+            page_added = []
             for issue in issues:
                 stats["processed"] += 1
                 result = await self._process_issue(issue, existing_ids)
                 stats[result] += 1
+                if result == "success":
+                    page_added.append(issue.get('key', 'unknown'))
+            
+            try:
+                self.writer.flush()
+            except Exception as e:
+                logger.error(f"❌ Failed to store {len(page_added)} issues from this page: {e}")
+                stats["success"] -= len(page_added)
+                stats["failed"] += len(page_added)
+                existing_ids.difference_update(page_added)
             
             # Check if we've processed all issues
             total = issues_data.get("total", 0)
@@ -491,8 +509,7 @@ class JiraIntegration:
     def _get_existing_story_ids(self) -> set:
         """Get existing story IDs from LanceDB"""
         try:
-            df = self.table.to_pandas()
-            return set(df['storyID'].tolist())
+            return set(read_columns(self.table, ["storyID"]).column("storyID").to_pylist())
         except Exception as e:
             logger.error(f"❌ Error getting existing story IDs: {e}")
             return set()
@@ -525,11 +542,12 @@ class JiraIntegration:
             logger.debug(f"🔍 Content length for {story_id}: {len(content)} characters")
             
             # Generate embedding and summary
-            embedding = Config.EMBEDDING_MODEL.encode(content).tolist()
-            summary = self._generate_summary(content)
+            embedding = encode_cached(truncate_for_embedding(content)).tolist()
+            # In two-phase mode the summary is filled in later by fill_pending_summaries
+            summary = PENDING_SUMMARY if TWO_PHASE_INGESTION else self._generate_summary(content)
             
-            # Store in LanceDB
-            self.table.add([{
+            # Buffer for LanceDB; sync_stories flushes once per page of issues
+            self.writer.add([{
                 "project_id": data.get("project", ""),
                 "vector": embedding,
                 "storyID": story_id,
@@ -550,8 +568,9 @@ class JiraIntegration:
                     "updated": data.get("updated"),
                     "project_id": data.get("project", "")
                 })
-            }])
+            }], lambda success, error: self._index_chunks(success, story_id, data.get("project", ""), content))
             
+            existing_ids.add(story_id)
             logger.info(f"✅ Processed {story_id} (Project: {data.get('project', 'N/A')})")
             return "success"
             
@@ -560,28 +579,18 @@ class JiraIntegration:
             logger.debug(f"🔍 Issue data: {issue}")
             return "failed"
     
-    def _generate_summary(self, content: str) -> str:
-        """Generate summary using LLM with strict length limit"""
+    def _index_chunks(self, stored: bool, story_id: str, project_id: str, content: str):
+        """Flush callback: add chunk vectors once the story row itself has been written"""
+        if not stored:
+            return
         try:
-            prompt = (
-                "Generate a VERY CONCISE one-sentence summary (maximum 150 characters) of this Jira story. "
-                "Focus only on the main requirement or functionality. "
-                "Do not include technical details or implementation specifics.\n\n"
-                f"{content[:2000]}"
-            )
-            response = Config.llm.invoke(prompt)
-            summary = response.content.strip()
-            
-            # Enforce hard limit of 150 characters
-            if len(summary) > 150:
-                summary = summary[:147] + "..."
-                
-            return summary
+            index_story_chunks([{"storyID": story_id, "project_id": project_id, "text": content}])
         except Exception as e:
-            logger.error(f"❌ Summary generation failed: {e}")
-            # Create a truncated summary from the content itself
-            content_summary = content.strip().split('\n')[0][:147] + "..."
-            return content_summary
+            logger.warning(f"⚠️ Chunk indexing failed for {story_id}: {e}")
+    
+    def _generate_summary(self, content: str) -> str:
+        """Generate summary using LLM with strict length limit"""
+        return summarize_jira_story(content)
 
 # Usage example
 async def main():
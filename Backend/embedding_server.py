@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Add the Backend directory to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from dotenv import load_dotenv
+from app.services.embedding_service import serve, DEFAULT_HOST, DEFAULT_PORT
+
+load_dotenv()
+
+if __name__ == '__main__':
+    print("🚀 Starting shared embedding service...")
+    serve(
+        host=os.getenv("EMBEDDING_SERVICE_HOST", DEFAULT_HOST),
+        port=int(os.getenv("EMBEDDING_SERVICE_PORT", str(DEFAULT_PORT))),
+        num_threads=int(os.getenv("EMBEDDING_SERVICE_THREADS", "0")) or None
+    )
@@ -1,7 +1,11 @@
+import os
 from app import create_app
+from app.config import Config
 
-app = create_app()
+# With the debug reloader only the child process (WERKZEUG_RUN_MAIN=true) serves requests,
+# so the watcher process never loads the models
+app = create_app(warm_up=Config.WARM_UP_MODELS and os.environ.get("WERKZEUG_RUN_MAIN") == "true")
 
 if __name__ == '__main__':
     print("🚀 Starting Flask application...")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=True)
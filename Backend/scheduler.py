@@ -1,10 +1,19 @@
 import os
 import time
 import asyncio
+import threading
 from datetime import datetime, timedelta
+from typing import Optional
 from apscheduler.schedulers.blocking import BlockingScheduler
-from app.datapipeline.embedding_generator import generate_embeddings
+from app.datapipeline.embedding_generator import (
+    generate_embeddings, process_project_folder, load_story_id_index, story_id_exists,
+    ensure_project_folders, move_file, UPLOAD_FOLDER
+)
+from app.datapipeline.folder_watcher import UploadFolderWatcher
+from app.datapipeline.summary_backfill import fill_all_pending_summaries
+from app.LLM.summarizer import TWO_PHASE_INGESTION
 from app.LLM.Test_case_generator import generate_test_cases_for_all_stories
+from app.models.lance_maintenance import run_maintenance
 
 # Import Jira integration
 try:
@@ -17,6 +26,14 @@ except ImportError:
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NEXT_RELOAD_FILE = os.path.join(BASE_DIR, 'next_reload.txt')
 
+# Ingest uploaded files as soon as they are written instead of on the 5-minute rescan
+UPLOAD_WATCH_ENABLED = os.getenv('UPLOAD_WATCH_ENABLED', 'false').lower() == 'true'
+# The watcher and the interval job never ingest (or generate) at the same time; the locks are
+# separate so a file written during a long generation run is still ingested right away
+ingest_lock = threading.Lock()
+generation_lock = threading.Lock()
+_upload_watcher: Optional[UploadFolderWatcher] = None
+
 def get_jira_config():
     """Get Jira configuration from environment variables - read fresh each time"""
     jira_sync_enabled = os.getenv('JIRA_SYNC_ENABLED', 'false').lower() == 'true'
@@ -88,7 +105,51 @@ async def sync_jira_stories():
     except Exception as e:
         print(f"❌ [Scheduler] Error syncing from Jira: {e}")
 
+def ingest_uploaded_files(project_name, files):
+    """Watcher callback: ingest settled files of one project, then generate their test cases"""
+    with ingest_lock:
+        project_path = os.path.join(UPLOAD_FOLDER, project_name)
+        story_ids = load_story_id_index()
+        new_files = []
+        for file in files:
+            file_path = os.path.join(project_path, file)
+            # The interval rescan (or a manual run) may have taken the file while it settled
+            if not os.path.isfile(file_path):
+                print(f"⚠️ [Watcher] {file} is gone, skipping")
+                continue
+            story_id = os.path.splitext(file)[0]
+            if story_id_exists(story_ids, story_id):
+                print(f"⚠️ [Watcher] Skipping {file} — storyID '{story_id}' already exists.")
+                move_file(file_path, ensure_project_folders(project_name)[1])
+                continue
+            new_files.append(file)
+        if not new_files:
+            return
+        print(f"📥 [Watcher] {len(new_files)} new file(s) in {project_name}: {', '.join(new_files)}")
+        _, files_success, _ = process_project_folder(project_path, project_name, story_ids, files=new_files)
+    if files_success > 0:
+        # Off the watcher thread, so the next upload is not held up by generation
+        threading.Thread(target=_generate_for_new_stories, name="watcher-generation", daemon=True).start()
+
+def _generate_for_new_stories():
+    with generation_lock:
+        if TWO_PHASE_INGESTION:
+            fill_all_pending_summaries()
+        print("🧠 [Watcher] Generating test cases for new stories...")
+        generate_test_cases_for_all_stories()
+
+def start_upload_watcher() -> Optional[UploadFolderWatcher]:
+    """Start the upload folder watcher once per process when UPLOAD_WATCH_ENABLED is set"""
+    global _upload_watcher
+    if UPLOAD_WATCH_ENABLED and _upload_watcher is None:
+        _upload_watcher = UploadFolderWatcher(UPLOAD_FOLDER, ingest_uploaded_files)
+        _upload_watcher.start()
+    return _upload_watcher
+
 def scheduled_job():
+    run_pipeline()
+
+def run_pipeline():
     print("🔄 [Scheduler] Starting data pipeline...")
     print(f"⏰ [Scheduler] Job started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
@@ -103,16 +164,30 @@ def scheduled_job():
                 time.sleep(5)
         
         # Step 1: Process project folders and generate embeddings
-        print("📁 [Scheduler] Step 1: Processing project folders and generating embeddings...")
-        generate_embeddings()
+        if _upload_watcher is not None:
+            print("📁 [Scheduler] Step 1: Skipped, uploaded files are ingested by the folder watcher")
+        else:
+            print("📁 [Scheduler] Step 1: Processing project folders and generating embeddings...")
+            with ingest_lock:
+                generate_embeddings()
         
         # Add a delay to ensure LanceDB is properly updated
         print("⏳ [Scheduler] Waiting 2 seconds for LanceDB to update...")
         time.sleep(2)
         
-        # Step 2: Generate test cases for all stories
-        print("🧠 [Scheduler] Step 2: Generating test cases for all stories...")
-        generate_test_cases_for_all_stories()
+        with generation_lock:
+            # Step 1b: Summaries of stories stored by two-phase ingestion (Jira or folders)
+            if TWO_PHASE_INGESTION:
+                print("📝 [Scheduler] Step 1b: Filling in pending story summaries...")
+                fill_all_pending_summaries()
+            
+            # Step 2: Generate test cases for all stories
+            print("🧠 [Scheduler] Step 2: Generating test cases for all stories...")
+            generate_test_cases_for_all_stories()
+        
+        # Step 3: Merge the fragments left by this run's writes
+        print("🧹 [Scheduler] Step 3: LanceDB maintenance...")
+        run_maintenance()
         
         # Calculate and store next reload time
         next_time = datetime.now() + timedelta(minutes=5)
@@ -131,6 +206,8 @@ def display_configuration():
     """Display current configuration"""
     print("📋 [Scheduler] Configuration:")
     print(f"   JIRA_AVAILABLE: {JIRA_AVAILABLE}")
+    print(f"   UPLOAD_WATCH_ENABLED: {UPLOAD_WATCH_ENABLED}")
+    print(f"   TWO_PHASE_INGESTION: {TWO_PHASE_INGESTION}")
     
     # Read config fresh for display
     jira_config = get_jira_config()
@@ -153,6 +230,9 @@ if __name__ == '__main__':
     # Initialize reload time file on startup
     initialize_reload_time()
     
+    # The watcher picks up files left from before the restart on its first scan
+    start_upload_watcher()
+
     # Run once at startup
     print("🔄 [Scheduler] Running initial pipeline...")
     scheduled_job()
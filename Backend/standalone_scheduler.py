@@ -6,7 +6,7 @@ from datetime import datetime, timedelta
 from flask import Flask, jsonify
 from flask_cors import CORS
 from apscheduler.schedulers.background import BackgroundScheduler
-from scheduler import scheduled_job  # Import the job directly
+from scheduler import scheduled_job, start_upload_watcher  # Import the job directly
 from apscheduler.triggers.interval import IntervalTrigger
 
 app = Flask(__name__)
@@ -81,6 +81,9 @@ def trigger_scheduler():
 if __name__ == '__main__':
     print("🚀 Starting Enhanced Test Case Generator Scheduler...")
     
+    # Ingest uploads as they arrive (UPLOAD_WATCH_ENABLED); the interval job then skips the folder rescan
+    start_upload_watcher()
+    
     # Initialize scheduler
     scheduler = BackgroundScheduler()
     scheduler.add_job(run_scheduler_job, 'interval', minutes=5)